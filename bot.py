@@ -1,14 +1,21 @@
+import asyncio
+import functools
+import json
 import sqlite3
 import logging
 import datetime
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 from telegram.constants import ParseMode
 
 # Import our LeetCode API function from the other file
 try:
-    from leetcode_api import fetch_recent_submissions, fetch_problem_difficulty
+    from leetcode_api import fetch_recent_submissions_bulk, fetch_problem_difficulties_bulk
 except ImportError:
     print("!!! ERROR: Make sure 'leetcode_api.py' is in the same directory.")
     exit(1)
@@ -17,16 +24,73 @@ except ImportError:
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 DB_NAME = os.environ.get("DB_NAME", "leetcode_bot.db")
 CHECK_INTERVAL_SECONDS = 3600  # 3600 seconds = 1 hour
+LEETCODE_MAX_CONCURRENT_REQUESTS = 10  # Max LeetCode API requests in flight per collection tick
+LEETCODE_SUBMISSIONS_BATCH_SIZE = 20  # Users per aliased GraphQL request (LeetCode complexity limit)
+LEETCODE_PROBLEMS_BATCH_SIZE = 20  # Problems per aliased GraphQL request
+COLLECTOR_SLOW_WARNING_SECONDS = CHECK_INTERVAL_SECONDS * 5 // 6  # Warn when a tick uses over 5/6 of the interval
+PROBLEM_INFO_CACHE_SIZE = 4096  # Max problems kept in memory in front of problem_info
+REPORT_MAX_CONCURRENT_SENDS = 10  # Max groups receiving the daily report at the same time
+REPORT_SEND_TIMEOUT_SECONDS = 30  # Give up on one group's daily report after this long
+
+# Telegram rejects messages over 4096 characters; leave room for entity overhead
+REPORT_MESSAGE_LIMIT = 3900
+
+# Report icon per problem difficulty; anything unknown is shown as Hard
+DIFF_ICON = {"Easy": "🟢", "Medium": "🟠", "Hard": "🔴"}
 
 if not TELEGRAM_BOT_TOKEN:
     print("!!! ERROR: TELEGRAM_BOT_TOKEN environment variable not set.")
     exit(1)
 
 # --- Database Setup ---
+
+# Shared connection, opened once in init_db() and reused by every job.
+# Reusing it keeps SQLite's page cache and the sqlite3 statement cache warm instead
+# of paying connect + schema parse + statement compile on every command.
+# The statement cache is keyed by SQL text, so keep SQL strings constant (bind
+# values as parameters, never format them into the query).
+CONN = None
+
+# Command handlers run their SQLite work in worker threads (see run_handler_db)
+# on a second long-lived connection, so a slow write or WAL checkpoint never
+# stalls the event loop. The lock serializes the threads sharing it.
+HANDLER_CONN = None
+_HANDLER_DB_LOCK = threading.Lock()
+
+# Chat IDs known to be registered. Groups are never unregistered, so a hit here
+# is always valid; misses fall back to the database (see is_group_registered).
+_REGISTERED_GROUPS = set()
+
+# In-process LRU in front of the problem_info table: slug -> (difficulty, title).
+_PROBLEM_INFO_CACHE = OrderedDict()
+
+# posted_today keys (chat_id, leetcode_username, problem_slug) for _POSTED_TODAY_DATE.
+# The collector is the only writer of today's rows, so after one load per UTC day
+# it keeps this set in step with the table instead of re-reading it every tick.
+_POSTED_TODAY_DATE = None
+_POSTED_TODAY = set()
+
+# Set once migrate_legacy_tables() has run with a registered group present; after
+# that every legacy table has been converted and later calls are no-ops.
+_LEGACY_MIGRATION_DONE = False
+
+def _connect():
+    """Opens the shared SQLite connection with WAL and cache-friendly pragmas."""
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    # Reads (reports, lookups) are served from a memory map instead of pread() calls
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
 def init_db():
     """Initializes the SQLite database and creates tables if they don't exist."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    global CONN, HANDLER_CONN, _LEGACY_MIGRATION_DONE, _POSTED_TODAY_DATE
+    close_db()
+    CONN = _connect()
+    cursor = CONN.cursor()
 
     # Table to store the LeetCode usernames to track
     cursor.execute("""
@@ -49,6 +113,7 @@ def init_db():
         chat_id INTEGER NOT NULL,
         leetcode_username TEXT NOT NULL,
         display_name TEXT NOT NULL,
+        last_seen_ts INTEGER,
         PRIMARY KEY (chat_id, leetcode_username)
     )
     """)
@@ -84,12 +149,70 @@ def init_db():
     )
     """)
 
+    _LEGACY_MIGRATION_DONE = False
     migrate_legacy_tables(cursor)
 
-    conn.commit()
-    conn.close()
+    # Lets the report JOIN, the streak probe and the cleanup job seek by date
+    # instead of walking the (chat_id, ...) primary key.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_posted_today_date ON posted_today(date_posted, leetcode_username)"
+    )
+    # Report query: one group's rows for one date
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_posted_today_chat_date ON posted_today(chat_id, date_posted)"
+    )
+    # /list and the report read a group's users ordered by display name; this
+    # covers both without a table lookup or a sort
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_group_tracked_users_chat_display "
+        "ON group_tracked_users(chat_id, display_name, leetcode_username)"
+    )
+
+    # Gather planner statistics once so the indexes above are actually chosen;
+    # close_db() keeps them fresh with PRAGMA optimize.
+    if not _table_exists(cursor, "sqlite_stat1"):
+        cursor.execute("ANALYZE")
+
+    CONN.commit()
+    HANDLER_CONN = _connect()
+
+    _POSTED_TODAY_DATE = None
+    _POSTED_TODAY.clear()
+
+    _REGISTERED_GROUPS.clear()
+    _REGISTERED_GROUPS.update(row[0] for row in cursor.execute("SELECT chat_id FROM groups"))
+
+    # Pre-warm the problem cache so popular problems never touch SQLite again.
+    _PROBLEM_INFO_CACHE.clear()
+    cursor.execute(
+        "SELECT problem_slug, difficulty, title FROM problem_info LIMIT ?",
+        (PROBLEM_INFO_CACHE_SIZE,)
+    )
+    for problem_slug, difficulty, title in cursor:
+        _PROBLEM_INFO_CACHE[problem_slug] = (difficulty, title)
     print("Database initialized successfully.")
 
+def close_db():
+    """Closes the shared connections, if they are open."""
+    global CONN, HANDLER_CONN
+    if HANDLER_CONN is not None:
+        HANDLER_CONN.close()
+        HANDLER_CONN = None
+    if CONN is not None:
+        CONN.execute("PRAGMA optimize")
+        CONN.close()
+        CONN = None
+
+def is_group_registered(db_cursor, chat_id: int) -> bool:
+    """Checks whether a group ran /register_group, using the in-memory set first."""
+    if chat_id in _REGISTERED_GROUPS:
+        return True
+    db_cursor.execute("SELECT 1 FROM groups WHERE chat_id = ?", (chat_id,))
+    if db_cursor.fetchone() is None:
+        return False
+    _REGISTERED_GROUPS.add(chat_id)
+    return True
+
 def _table_exists(db_cursor, table_name: str) -> bool:
     db_cursor.execute(
         "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
@@ -98,11 +221,22 @@ def _table_exists(db_cursor, table_name: str) -> bool:
     return db_cursor.fetchone() is not None
 
 def _table_has_column(db_cursor, table_name: str, column_name: str) -> bool:
-    db_cursor.execute(f"PRAGMA table_info({table_name})")
-    return any(row[1] == column_name for row in db_cursor.fetchall())
+    db_cursor.execute(
+        "SELECT 1 FROM pragma_table_info(?) WHERE name = ?",
+        (table_name, column_name)
+    )
+    return db_cursor.fetchone() is not None
 
 def migrate_legacy_tables(db_cursor):
     """Migrates legacy tables/data to support per-group tracking."""
+    global _LEGACY_MIGRATION_DONE
+    if _LEGACY_MIGRATION_DONE:
+        return
+
+    # Legacy data is moved into the first registered group
+    db_cursor.execute("SELECT chat_id FROM groups ORDER BY chat_id LIMIT 1")
+    group_row = db_cursor.fetchone()
+
     # Ensure posted_today has chat_id
     if _table_exists(db_cursor, "posted_today") and not _table_has_column(db_cursor, "posted_today", "chat_id"):
         db_cursor.execute("ALTER TABLE posted_today RENAME TO posted_today_legacy")
@@ -115,8 +249,6 @@ def migrate_legacy_tables(db_cursor):
             PRIMARY KEY (chat_id, leetcode_username, problem_slug, date_posted)
         )
         """)
-        db_cursor.execute("SELECT chat_id FROM groups ORDER BY chat_id LIMIT 1")
-        group_row = db_cursor.fetchone()
         if group_row:
             db_cursor.execute("""
             INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted)
@@ -125,24 +257,55 @@ def migrate_legacy_tables(db_cursor):
             """, (group_row[0],))
         db_cursor.execute("DROP TABLE posted_today_legacy")
 
+    # Newest submission timestamp the collector has processed per group/user
+    if not _table_has_column(db_cursor, "group_tracked_users", "last_seen_ts"):
+        db_cursor.execute("ALTER TABLE group_tracked_users ADD COLUMN last_seen_ts INTEGER")
+
     # Migrate legacy tracked_users into the first registered group
-    db_cursor.execute("SELECT COUNT(*) FROM group_tracked_users")
-    has_group_users = db_cursor.fetchone()[0] > 0
+    if not group_row:
+        # Nothing to migrate into yet; /register_group calls us again
+        return
+
+    db_cursor.execute("SELECT 1 FROM group_tracked_users LIMIT 1")
+    has_group_users = db_cursor.fetchone() is not None
     if not has_group_users and _table_exists(db_cursor, "tracked_users"):
-        db_cursor.execute("SELECT chat_id FROM groups ORDER BY chat_id LIMIT 1")
-        group_row = db_cursor.fetchone()
-        if group_row:
-            chat_id = group_row[0]
-            db_cursor.execute("SELECT leetcode_username, display_name FROM tracked_users")
-            rows = db_cursor.fetchall()
-            if rows:
-                db_cursor.executemany(
-                    "INSERT OR IGNORE INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
-                    [(chat_id, row[0], row[1]) for row in rows]
-                )
+        db_cursor.execute("""
+        INSERT OR IGNORE INTO group_tracked_users (chat_id, leetcode_username, display_name)
+        SELECT ?, leetcode_username, display_name
+        FROM tracked_users
+        """, (group_row[0],))
+
+    _LEGACY_MIGRATION_DONE = True
 
 # --- Bot Command Handlers ---
 
+async def run_handler_db(func, *args):
+    """
+    Runs func(cursor, *args) in a worker thread on HANDLER_CONN as one
+    transaction (committed on success, rolled back on error) and returns its result.
+    """
+    def run():
+        with _HANDLER_DB_LOCK, HANDLER_CONN:
+            return func(HANDLER_CONN.cursor(), *args)
+    return await asyncio.to_thread(run)
+
+# Updates are processed concurrently (see main()). These locks keep commands
+# from the same chat in order while different chats are handled in parallel.
+_CHAT_LOCKS = weakref.WeakValueDictionary()
+
+def serialized_per_chat(handler):
+    """Wraps a command handler so only one update per chat runs at a time."""
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.effective_chat.id
+        lock = _CHAT_LOCKS.get(chat_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            _CHAT_LOCKS[chat_id] = lock
+        async with lock:
+            return await handler(update, context)
+    return wrapper
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the /start command."""
     await update.message.reply_text(
@@ -178,12 +341,8 @@ async def register_group_command(update: Update, context: ContextTypes.DEFAULT_T
         return
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO groups (chat_id) VALUES (?)", (chat_id,))
-        migrate_legacy_tables(cursor)
-        conn.commit()
-        conn.close()
+        await run_handler_db(_db_register_group, chat_id)
+        _REGISTERED_GROUPS.add(chat_id)
 
         await update.message.reply_text(
             f"✅ Success! This group (Chat ID: {chat_id}) is now registered for LeetCode updates."
@@ -194,6 +353,10 @@ async def register_group_command(update: Update, context: ContextTypes.DEFAULT_T
         await update.message.reply_text(f"An error occurred while registering the group: {e}")
         logging.error(f"Error registering group: {e}")
 
+def _db_register_group(db_cursor, chat_id: int):
+    db_cursor.execute("INSERT OR REPLACE INTO groups (chat_id) VALUES (?)", (chat_id,))
+    migrate_legacy_tables(db_cursor)
+
 async def add_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the /add <username> command."""
     if update.message.chat.type == "private":
@@ -212,32 +375,35 @@ async def add_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     display_name = " ".join(context.args[1:])
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM groups WHERE chat_id = ?", (update.message.chat_id,))
-        if not cursor.fetchone():
+        added = await run_handler_db(_db_add_user, update.message.chat_id, username_to_add, display_name)
+        if added is None:
             await update.message.reply_text("This group is not registered yet. Run `/register_group` first.")
-            conn.close()
             return
 
-        cursor.execute(
-            "INSERT OR IGNORE INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
-            (update.message.chat_id, username_to_add, display_name)
-        )
-        conn.commit()
-
-        if cursor.rowcount > 0:
+        if added:
             await update.message.reply_text(f"✅ User '{username_to_add}' is now being tracked as '{display_name}'.")
             logging.info(f"Added user: {username_to_add} as {display_name}")
         else:
             await update.message.reply_text(f"User '{username_to_add}' is already being tracked.")
 
-        conn.close()
-
     except Exception as e:
         await update.message.reply_text(f"An error occurred while adding the user: {e}")
         logging.error(f"Error adding user: {e}")
 
+def _db_add_user(db_cursor, chat_id: int, username: str, display_name: str):
+    """Returns True if the user was added, False if already tracked, None if the group is not registered."""
+    if not is_group_registered(db_cursor, chat_id):
+        return None
+
+    # RETURNING yields a row only when the user was actually inserted
+    # (requires SQLite >= 3.35).
+    db_cursor.execute(
+        "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?) "
+        "ON CONFLICT (chat_id, leetcode_username) DO NOTHING RETURNING leetcode_username",
+        (chat_id, username, display_name)
+    )
+    return db_cursor.fetchone() is not None
+
 async def remove_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the /remove <username> command."""
     if update.message.chat.type == "private":
@@ -251,26 +417,25 @@ async def remove_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     username_to_remove = context.args[0].strip()
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "DELETE FROM group_tracked_users WHERE chat_id = ? AND leetcode_username = ?",
-            (update.message.chat_id, username_to_remove)
-        )
-        conn.commit()
+        removed = await run_handler_db(_db_remove_user, update.message.chat_id, username_to_remove)
 
-        if cursor.rowcount > 0:
+        if removed:
             await update.message.reply_text(f"❌ User '{username_to_remove}' has been removed.")
             logging.info(f"Removed user: {username_to_remove}")
         else:
             await update.message.reply_text(f"User '{username_to_remove}' was not found in the tracking list.")
 
-        conn.close()
-
     except Exception as e:
         await update.message.reply_text(f"An error occurred while removing the user: {e}")
         logging.error(f"Error removing user: {e}")
 
+def _db_remove_user(db_cursor, chat_id: int, username: str) -> bool:
+    db_cursor.execute(
+        "DELETE FROM group_tracked_users WHERE chat_id = ? AND leetcode_username = ?",
+        (chat_id, username)
+    )
+    return db_cursor.rowcount > 0
+
 async def list_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the /list command."""
     if update.message.chat.type == "private":
@@ -278,30 +443,29 @@ async def list_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT leetcode_username, display_name FROM group_tracked_users WHERE chat_id = ? ORDER BY display_name",
-            (update.message.chat_id,)
-        )
-        users = cursor.fetchall()
-        conn.close()
+        user_lines = await run_handler_db(_db_list_user_lines, update.message.chat_id)
 
-        if not users:
+        if not user_lines:
             await update.message.reply_text("No LeetCode users are currently being tracked. Use `/add <username>` to add one.")
             return
 
-        message = "📈 Currently Tracked LeetCode Users:\n"
-        for i, user in enumerate(users):
-            # user[0] is leetcode_username, user[1] is display_name
-            message += f"  {i+1}. {user[1]} ({user[0]})\n"
-
-        await update.message.reply_text(message)
+        await update.message.reply_text("📈 Currently Tracked LeetCode Users:\n" + user_lines)
 
     except Exception as e:
         await update.message.reply_text(f"An error occurred while listing users: {e}")
         logging.error(f"Error listing users: {e}")
 
+def _db_list_user_lines(db_cursor, chat_id: int) -> str:
+    db_cursor.execute(
+        "SELECT leetcode_username, display_name FROM group_tracked_users WHERE chat_id = ? ORDER BY display_name",
+        (chat_id,)
+    )
+    # Rows are streamed from the cursor straight into a single join
+    return "".join(
+        f"  {i}. {display_name} ({username})\n"
+        for i, (username, display_name) in enumerate(db_cursor, start=1)
+    )
+
 async def manual_send_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Кечээки күндүн отчетун КОЛ МЕНЕН жөнөтүүнү баштайт.
@@ -311,14 +475,9 @@ async def manual_send_report_command(update: Update, context: ContextTypes.DEFAU
         return
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM groups WHERE chat_id = ?", (update.message.chat_id,))
-        if not cursor.fetchone():
+        if not await run_handler_db(is_group_registered, update.message.chat_id):
             await update.message.reply_text("This group is not registered yet. Run `/register_group` first.")
-            conn.close()
             return
-        conn.close()
     except Exception as e:
         await update.message.reply_text(f"Failed to verify group registration: {e}")
         return
@@ -354,14 +513,9 @@ async def manual_send_today_command(update: Update, context: ContextTypes.DEFAUL
         return
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM groups WHERE chat_id = ?", (update.message.chat_id,))
-        if not cursor.fetchone():
+        if not await run_handler_db(is_group_registered, update.message.chat_id):
             await update.message.reply_text("This group is not registered yet. Run `/register_group` first.")
-            conn.close()
             return
-        conn.close()
     except Exception as e:
         await update.message.reply_text(f"Failed to verify group registration: {e}")
         return
@@ -393,90 +547,179 @@ async def manual_send_today_command(update: Update, context: ContextTypes.DEFAUL
 
 # --- Core Automation Logic ---
 
+# Ensures at most one collector run is in flight if a tick outlasts the interval
+_COLLECTOR_LOCK = asyncio.Lock()
+
 async def check_for_updates(context: ContextTypes.DEFAULT_TYPE):
     """
     Бул эми **ҮНСҮЗ МААЛЫМАТ ЧОГУЛТУУЧУ**.
     Ар 1 саат сайын иштеп, "бүгүн" чечилген жаңы маселелерди таап,
     аларды `posted_today` жана `problem_info` таблицаларына сактайт.
     ЭЧ КАНДАЙ БИЛДИРҮҮ ЖӨНӨТПӨЙТ.
+    Мурунку чогултуу али бүтө элек болсо, бул жолку иштетүү өткөрүлүп жиберилет.
     """
+    if _COLLECTOR_LOCK.locked():
+        logging.warning("Job: Previous DATA COLLECTION is still running. Skipping this tick.")
+        return
+
+    async with _COLLECTOR_LOCK:
+        started = time.monotonic()
+        await _collect_submissions()
+        elapsed = time.monotonic() - started
+        if elapsed > COLLECTOR_SLOW_WARNING_SECONDS:
+            logging.warning(f"Job: DATA COLLECTION took {elapsed:.0f}s, close to the {CHECK_INTERVAL_SECONDS}s interval.")
+
+async def _collect_submissions():
+    """check_for_updates'тин негизги бөлүгү; _COLLECTOR_LOCK алынгандан кийин чакырылат."""
+    global _POSTED_TODAY_DATE
     logging.info("Job: Running DATA COLLECTION check...")
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    cursor = CONN.cursor()
 
     # 1. Бардык группаларды алуу
     cursor.execute("SELECT chat_id FROM groups")
     groups = cursor.fetchall()
     if not groups:
         logging.info("Job: No groups registered. Skipping collection.")
-        conn.close()
         return
 
-    # 2. "Бүгүн" (UTC) датасын аныктоо
-    today_utc_str = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+    # 2. "Бүгүн" (UTC) датасын жана анын башталыш убактысын (Unix) аныктоо
+    today_utc = datetime.datetime.now(datetime.timezone.utc).date()
+    today_utc_str = today_utc.strftime('%Y-%m-%d')
+    today_start_ts = int(datetime.datetime.combine(
+        today_utc, datetime.time.min, tzinfo=datetime.timezone.utc
+    ).timestamp())
+
+    # Бир колдонуучу бир нече группада көзөмөлдөнүшү мүмкүн. LeetCode'го ар бир
+    # колдонуучу үчүн бир гана жолу кайрылып, натыйжаны анын группаларына таратабыз.
+    # last_seen_ts: бул группа үчүн акыркы иштетилген тапшырманын убактысы.
+    chats_by_user = defaultdict(list)
+    cursor.execute("""
+    SELECT gtu.leetcode_username, gtu.chat_id, gtu.last_seen_ts
+    FROM group_tracked_users AS gtu
+    JOIN groups AS g ON g.chat_id = gtu.chat_id
+    """)
+    for username, chat_id, last_seen_ts in cursor.fetchall():
+        chats_by_user[username].append((chat_id, last_seen_ts))
+
+    if not chats_by_user:
+        logging.info("Job: No users to track. Skipping collection.")
+        return
 
-    for (chat_id,) in groups:
+    # 3. Бардык колдонуучулардын тапшырмаларын алуу. Колдонуучулар
+    # LEETCODE_SUBMISSIONS_BATCH_SIZE өлчөмүндөгү топторго бөлүнүп, ар бир топ
+    # бир GraphQL суроосу менен алынат; топтор параллелдүү жөнөтүлөт.
+    # fetch_recent_submissions_bulk блоктоочу функция, ошондуктан event loop'ту
+    # токтотпош үчүн аны өзүнчө thread'де иштетебиз. Semaphore бир убактагы
+    # суроолордун санын чектейт (LeetCode rate limit).
+    semaphore = asyncio.Semaphore(LEETCODE_MAX_CONCURRENT_REQUESTS)
+    usernames = list(chats_by_user)
+
+    async def fetch_batch(batch: list):
+        async with semaphore:
+            logging.info(f"Job: Collecting data for {len(batch)} user(s)...")
+            try:
+                return await asyncio.to_thread(fetch_recent_submissions_bulk, batch, limit=15)
+            except Exception as e:
+                logging.error(f"Job: Error fetching submissions for {batch}: {e}")
+                return dict.fromkeys(batch)
+
+    batches = await asyncio.gather(*(
+        fetch_batch(usernames[start:start + LEETCODE_SUBMISSIONS_BATCH_SIZE])
+        for start in range(0, len(usernames), LEETCODE_SUBMISSIONS_BATCH_SIZE)
+    ))
+    submissions_by_user = {}
+    for batch in batches:
+        submissions_by_user.update(batch)
+    fetched = [(username, submissions_by_user.get(username)) for username in usernames]
+
+    # Бүгүн катталган маселелер эстутумдагы set'те сакталат. DB'ден күнүнө бир
+    # гана жолу (UTC түн жарымынан кийинки биринчи текшерүүдө) жүктөлөт.
+    if _POSTED_TODAY_DATE != today_utc_str:
         cursor.execute(
-            "SELECT leetcode_username, display_name FROM group_tracked_users WHERE chat_id = ?",
-            (chat_id,)
+            "SELECT chat_id, leetcode_username, problem_slug FROM posted_today WHERE date_posted = ?",
+            (today_utc_str,)
         )
-        users = cursor.fetchall()
+        _POSTED_TODAY.clear()
+        _POSTED_TODAY.update(cursor.fetchall())
+        _POSTED_TODAY_DATE = today_utc_str
+    already_posted = _POSTED_TODAY
+
+    # Жаңы жазуулар тизмеге чогултулуп, аягында бир транзакцияда сакталат
+    new_rows = []
+    seen_updates = []
 
-        if not users:
-            logging.info(f"Job: No users to track for group {chat_id}.")
+    for username, submissions in fetched:
+        if not submissions:
             continue
 
-        for user_row in users:
-            username = user_row[0]
-            logging.info(f"Job: Collecting data for user {username} (group {chat_id})...")
+        user_rows = []
+        try:
+            # Эң акыркы тапшырма мурдагы текшерүүдөн бери өзгөрбөсө, ал группаны
+            # толугу менен өткөрүп жиберебиз. last_seen_ts жок (жаңы кошулган)
+            # группалар ар дайым текшерилет.
+            newest_ts = int(submissions[0]['timestamp'])
+            chat_ids = [
+                chat_id for chat_id, last_seen_ts in chats_by_user[username]
+                if last_seen_ts is None or newest_ts > last_seen_ts
+            ]
+            if not chat_ids:
+                continue
 
-            try:
-                submissions = fetch_recent_submissions(username, limit=15)
-                if submissions is None:
-                    continue
-
-                for sub in submissions:
-                    # 3. Тапшырма "бүгүн" чечилгенин текшерүү
-                    timestamp = int(sub['timestamp'])
-                    submit_time_utc = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
-                    submit_date_str = submit_time_utc.strftime('%Y-%m-%d')
-
-                    if submit_date_str != today_utc_str:
-                        # Эски тапшырма, бул колдонуучу үчүн токтотуу
-                        break
-
-                    problem_slug = sub['titleSlug']
-
-                    # 4. "Бүгүн" үчүн бул маселе мурда катталганын текшерүү
-                    cursor.execute(
-                        "SELECT 1 FROM posted_today WHERE chat_id = ? AND leetcode_username = ? AND problem_slug = ? AND date_posted = ?",
-                        (chat_id, username, problem_slug, today_utc_str)
-                    )
-                    if cursor.fetchone():
+            for sub in submissions:
+                # 4. Тапшырма "бүгүн" чечилгенин текшерүү (бүтүн сандарды салыштыруу менен)
+                if int(sub['timestamp']) < today_start_ts:
+                    # Эски тапшырма, бул колдонуучу үчүн токтотуу
+                    break
+
+                problem_slug = sub['titleSlug']
+
+                for chat_id in chat_ids:
+                    # 5. "Бүгүн" үчүн бул маселе бул группада мурда катталганын текшерүү
+                    posted_key = (chat_id, username, problem_slug)
+                    if posted_key in already_posted:
                         # Мурда катталган, кийинкиге өтүү
                         continue
 
-                    # 5. Эгер жаңы болсо, кэшти толтуруу жана маалымат базасына каттоо
+                    # 6. Эгер жаңы болсо, сактоо үчүн тизмеге кошуу
                     logging.info(f"Job: Found new submission for {username} (group {chat_id}): {problem_slug}")
+                    already_posted.add(posted_key)
+                    user_rows.append((chat_id, username, problem_slug, today_utc_str))
 
-                    # Маселенин маалыматын (аталышы/кыйынчылыгы) алып, кэшти толтуруу
-                    # Бул кийинчерээк отчет үчүн керек
-                    get_or_fetch_problem_info(cursor, problem_slug)
-
-                    # "posted_today" таблицасына каттоо
-                    cursor.execute(
-                        "INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
-                        (chat_id, username, problem_slug, today_utc_str)
-                    )
+        except Exception as e:
+            # Ката болсо, бул колдонуучунун жазууларын таштап, кийинкисине өтүү
+            logging.error(f"Job: Error during data collection for {username}: {e}")
+            already_posted.difference_update(row[:3] for row in user_rows)
+            continue
 
-                conn.commit() # Ар бир колдонуучудан кийин сактоо
+        new_rows.extend(user_rows)
+        seen_updates.extend((newest_ts, chat_id, username) for chat_id in chat_ids)
 
-            except Exception as e:
-                logging.error(f"Job: Error during data collection for {username} (group {chat_id}): {e}")
-                conn.rollback() # Ката болсо, бул колдонуучунун өзгөрүүлөрүн артка кайтаруу
-                continue
+    # 7. Жаңы маселелердин маалыматын (кыйынчылык/аталыш) топтоп алуу.
+    # Бул маалымат кийинчерээк отчет үчүн керек.
+    new_slugs = {row[2] for row in new_rows}
+    try:
+        # Маселе суроолору колдонуучу суроолору менен бир эле чекти бөлүшөт
+        await bulk_get_or_fetch_problem_info(cursor, new_slugs, semaphore)
+
+        # 8. "problem_info" жана "posted_today" таблицаларына бир commit менен каттоо
+        with CONN:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
+                new_rows
+            )
+            cursor.executemany(
+                "UPDATE group_tracked_users SET last_seen_ts = ? WHERE chat_id = ? AND leetcode_username = ?",
+                seen_updates
+            )
+    except Exception as e:
+        logging.error(f"Job: Failed to save collected submissions: {e}")
+        CONN.rollback()
+        # problem_info rows inserted in the rolled back transaction are gone as well
+        for problem_slug in new_slugs:
+            _PROBLEM_INFO_CACHE.pop(problem_slug, None)
+        already_posted.difference_update(row[:3] for row in new_rows)
+        return
 
-    conn.close()
     logging.info("Job: DATA COLLECTION finished.")
 
 async def generate_and_send_report(
@@ -492,123 +735,198 @@ async def generate_and_send_report(
     Маалымат табылса 'True', табылбаса 'False' кайтарат.
     """
     logging.info(f"Job: Generating report for date: {date_str}")
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
 
-    # 1. Бардык колдонуучуларды алуу (тизме жана тартип үчүн керек)
-    cursor.execute(
-        "SELECT leetcode_username, display_name FROM group_tracked_users WHERE chat_id = ? ORDER BY display_name",
-        (chat_id,)
-    )
-    tracked_users = cursor.fetchall()
+    try:
+        messages = await run_handler_db(_db_build_report, chat_id, date_str, update_streaks)
+    except Exception as e:
+        logging.error(f"Job: Failed to build report for group {chat_id}: {e}")
+        return False
 
-    if not tracked_users:
+    if messages is None:
         logging.info("Job: No tracked users. No report sent.")
-        conn.close()
         return False
+    return await send_report_messages(context, chat_id, date_str, messages)
+
+def _db_build_report(db_cursor, chat_id: int, date_str: str, update_streaks: bool):
+    """
+    Loads one group's report data, updates streaks if asked and returns the
+    report messages, or None if the group has no tracked users.
+    """
+    tracked_by_chat, submissions_by_chat = load_report_data(db_cursor, date_str, [chat_id])
+    tracked_users = tracked_by_chat.get(chat_id)
+    if not tracked_users:
+        return None
 
-    # 3. Берилген дата ('date_str') боюнча бардык маалыматты DB'ден алуу
+    streaks = compute_report_streaks(
+        db_cursor, date_str, [username for username, _display_name in tracked_users], update_streaks
+    )
+    return build_report_messages(date_str, tracked_users, submissions_by_chat.get(chat_id, {}), streaks)
+
+def load_report_data(db_cursor, date_str: str, chat_ids: list) -> (dict, dict):
+    """
+    Loads report data for several groups at once.
+    Returns (tracked_by_chat, submissions_by_chat): chat_id -> [(username, display_name)]
+    ordered by display name, and chat_id -> {username: [(difficulty, slug, title)]}.
+    """
+    chat_ids_json = json.dumps(chat_ids)
+
+    # 1. Бардык колдонуучуларды алуу (тизме жана тартип үчүн керек)
+    tracked_by_chat = defaultdict(list)
+    db_cursor.execute(
+        "SELECT chat_id, leetcode_username, display_name FROM group_tracked_users "
+        "WHERE chat_id IN (SELECT value FROM json_each(?)) ORDER BY chat_id, display_name",
+        (chat_ids_json,)
+    )
+    for chat_id, username, display_name in db_cursor:
+        tracked_by_chat[chat_id].append((username, display_name))
+
+    # 2. Берилген дата ('date_str') боюнча бардык маалыматты DB'ден алуу.
+    # SQLite ар бир (группа, колдонуучу) үчүн бир гана сап кайтарат: маселелер
+    # "difficulty|slug|title" түрүндө, жаңы сап (char(10)) менен бириктирилет.
+    # Аталыш акыркы турат, ошондуктан анын ичиндеги '|' split'ке тоскоол болбойт.
     query = """
     SELECT
-        gtu.leetcode_username,
-        gtu.display_name,
-        pi.title,
-        pi.difficulty,
-        pi.problem_slug
-    FROM posted_today AS pt
-    JOIN group_tracked_users AS gtu ON pt.chat_id = gtu.chat_id AND pt.leetcode_username = gtu.leetcode_username
-    JOIN problem_info AS pi ON pt.problem_slug = pi.problem_slug
-    WHERE pt.date_posted = ? AND pt.chat_id = ?
-    ORDER BY gtu.display_name, pi.difficulty
+        chat_id,
+        leetcode_username,
+        GROUP_CONCAT(difficulty || '|' || problem_slug || '|' || title, char(10))
+    FROM (
+        SELECT pt.chat_id, pt.leetcode_username, pi.difficulty, pi.problem_slug, pi.title
+        FROM posted_today AS pt
+        JOIN group_tracked_users AS gtu ON pt.chat_id = gtu.chat_id AND pt.leetcode_username = gtu.leetcode_username
+        JOIN problem_info AS pi ON pt.problem_slug = pi.problem_slug
+        WHERE pt.date_posted = ? AND pt.chat_id IN (SELECT value FROM json_each(?))
+    )
+    GROUP BY chat_id, leetcode_username
+    """
+    submissions_by_chat = defaultdict(dict)
+    db_cursor.execute(query, (date_str, chat_ids_json))
+    for chat_id, username, blob in db_cursor:
+        # GROUP_CONCAT'тын тартиби аныкталган эмес, ошондуктан маселелер бул жерде
+        # кыйынчылыгы боюнча иреттелет.
+        submissions = [tuple(line.split("|", 2)) for line in blob.split("\n")]
+        submissions.sort(key=lambda submission: submission[0])
+        submissions_by_chat[chat_id][username] = submissions
+
+    return tracked_by_chat, submissions_by_chat
+
+def compute_report_streaks(db_cursor, date_str: str, usernames, update_streaks: bool) -> dict:
     """
+    Returns username -> (streak_value, show_streak) for a report on date_str.
+    With update_streaks the new values are written too (the caller commits).
+    """
+    # Streak'терди ар бир колдонуучу үчүн өзүнчө суроо менен эмес,
+    # эки гана суроо менен алуу.
+    db_cursor.execute(
+        "SELECT leetcode_username, last_date, streak_value FROM user_streaks "
+        "WHERE leetcode_username IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(usernames)),)
+    )
+    stored_streaks = {username: (last_date, streak_value) for username, last_date, streak_value in db_cursor.fetchall()}
 
-    try:
-        cursor.execute(query, (date_str, chat_id))
-        results = cursor.fetchall()
-    except Exception as e:
-        logging.error(f"Job: Failed to query database for report: {e}")
-        conn.close()
-        return False
+    if update_streaks:
+        # Streaks are global per user, so a user counts as solved if they solved
+        # on this date in any tracked group.
+        db_cursor.execute(
+            "SELECT DISTINCT leetcode_username FROM posted_today WHERE date_posted = ?",
+            (date_str,)
+        )
+        solved_anywhere = {row[0] for row in db_cursor.fetchall()}
 
-    # 4. Билдирүүнү топтоо
-    report_data = {}
-    for username, display_name in tracked_users:
-        report_data[username] = {
-            "display_name": display_name,
-            "submissions": []
-        }
+    streaks = {}
+    streak_updates = []
+    for username in usernames:
+        stored = stored_streaks.get(username)
+        if update_streaks:
+            streak_value, changed = compute_next_streak(stored, date_str, username in solved_anywhere)
+            if changed:
+                streak_updates.append((username, date_str, streak_value))
+            streaks[username] = (streak_value, True)
+        elif stored:
+            streaks[username] = (stored[1], True)
+        else:
+            streaks[username] = (0, False)
 
-    for row in results:
-        username, display_name, title, difficulty, slug = row
-        report_data[username]["submissions"].append((difficulty, title, slug))
+    if streak_updates:
+        save_user_streaks(db_cursor, streak_updates)
+    return streaks
 
+def build_report_messages(date_str: str, tracked_users: list, submissions_by_user: dict, streaks: dict) -> list:
+    """Renders one group's report as a list of Telegram-sized HTML messages."""
     solved_users = []
     sleepers = []
 
     for username, display_name in tracked_users:
-        submissions = report_data[username]["submissions"]
-        solved_in_group = len(submissions) > 0
-
-        if update_streaks:
-            # Streaks are global per user, so check whether the user solved on this date
-            # in any tracked group before updating user_streaks.
-            cursor.execute(
-                "SELECT 1 FROM posted_today WHERE leetcode_username = ? AND date_posted = ? LIMIT 1",
-                (username, date_str)
-            )
-            solved_anywhere_today = cursor.fetchone() is not None
-            streak_value, show_streak = update_user_streak(
-                cursor, username, date_str, solved_anywhere_today
-            )
-        else:
-            streak_value, show_streak = get_current_user_streak(cursor, username)
+        submissions = submissions_by_user.get(username, [])
+        streak_value, show_streak = streaks[username]
         streak_label = format_streak_label(streak_value) if show_streak else ""
         display_with_streak = f"{display_name}{streak_label}"
 
-        if solved_in_group:
+        if submissions:
             solved_users.append((display_with_streak, submissions, streak_value))
         else:
             sleepers.append((display_with_streak, streak_value))
 
-    # title_prefix жана date_str параметрлерин колдонуу
-    message_parts = []
+    # Билдирүү ар бир колдонуучу үчүн өзүнчө блокторго бөлүнөт, андан кийин
+    # блоктор Telegram'дын узундук чегинен ашпаган билдирүүлөргө топтолот.
+    # Бөлүмдүн аталышы биринчи колдонуучунун блогуна кошулат, ошондо ал
+    # билдирүүнүн аягында жалгыз калбайт.
+    blocks = []
     if solved_users:
         solved_users.sort(key=lambda item: item[2], reverse=True)
-        message = f"<b>{date_str}: Азаматтар</b>\n"
+        solved_blocks = []
         for display_name, submissions, _streak_value in solved_users:
-            message += f"\n<b>{display_name}</b>:\n"
-            for (difficulty, title, slug) in submissions:
-                problem_url = f"https://leetcode.com/problems/{slug}/"
-                diff_icon = "🟢" if difficulty == "Easy" else "🟠" if difficulty == "Medium" else "🔴"
-                message += f"   {diff_icon} <a href='{problem_url}'>{title}</a>\n"
-        message_parts.append(message)
+            parts = [f"\n<b>{display_name}</b>:\n"]
+            for (difficulty, slug, title) in submissions:
+                diff_icon = DIFF_ICON.get(difficulty, "🔴")
+                parts.append(f"   {diff_icon} <a href='https://leetcode.com/problems/{slug}/'>{title}</a>\n")
+            solved_blocks.append("".join(parts))
+        solved_blocks[0] = f"<b>{date_str}: Азаматтар</b>\n{solved_blocks[0]}"
+        blocks.extend(solved_blocks)
 
     if sleepers:
         sleepers.sort(key=lambda item: item[1])
-        message = f"<b>{date_str}: Уктап калгандар</b>\n"
-        for display_name, _streak_value in sleepers:
-            message += f"\n<b>{display_name}</b>\n"
-        message_parts.append(message)
+        section_gap = "\n" if blocks else ""
+        sleeper_blocks = [f"\n<b>{display_name}</b>\n" for display_name, _streak_value in sleepers]
+        sleeper_blocks[0] = f"{section_gap}<b>{date_str}: Уктап калгандар</b>\n{sleeper_blocks[0]}"
+        blocks.extend(sleeper_blocks)
 
-    message = "\n".join(message_parts)
+    return split_report_blocks(blocks)
 
-    # 5. Билдирүүнү жөнөтүү
+async def send_report_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int, date_str: str, messages: list) -> bool:
+    """Sends a rendered report to a group. Returns 'True' on success."""
     try:
-        conn.commit()
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=message,
-            parse_mode=ParseMode.HTML,
-            disable_web_page_preview=True
-        )
-        logging.info(f"Job: Successfully sent report for {date_str} to group {chat_id}")
-        conn.close()
+        for message in messages:
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=message,
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True
+            )
+        logging.info(f"Job: Successfully sent report for {date_str} to group {chat_id} ({len(messages)} message(s))")
         return True  # Маалымат жөнөтүлдү
     except Exception as e:
         logging.error(f"Job: Failed to send report to group {chat_id}: {e}")
-        conn.close()
         return False
 
+def split_report_blocks(blocks: list, limit: int = REPORT_MESSAGE_LIMIT) -> list:
+    """
+    Packs report blocks into as few messages as possible, each at most 'limit'
+    characters, without splitting a block (one user's entry) across messages.
+    """
+    messages = []
+    current = []
+    current_len = 0
+    for block in blocks:
+        if current and current_len + len(block) > limit:
+            messages.append("".join(current))
+            current = []
+            current_len = 0
+        current.append(block)
+        current_len += len(block)
+    if current:
+        messages.append("".join(current))
+    return messages
+
 async def send_daily_report(context: ContextTypes.DEFAULT_TYPE):
     """
     Бул АВТОМАТТЫК ОТЧЕТ ЖӨНӨТҮҮЧҮ (UTC 15:00).
@@ -620,15 +938,46 @@ async def send_daily_report(context: ContextTypes.DEFAULT_TYPE):
     yesterday_utc = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
     yesterday_utc_str = yesterday_utc.strftime('%Y-%m-%d')
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT chat_id FROM groups")
-    groups = cursor.fetchall()
-    conn.close()
+    cursor = CONN.cursor()
+    chat_ids = [row[0] for row in cursor.execute("SELECT chat_id FROM groups")]
+
+    # Бардык группалардын маалыматы жана streak'тер бир жолу алынат,
+    # андан кийин ар бир группага өз отчету жөнөтүлөт.
+    try:
+        tracked_by_chat, submissions_by_chat = load_report_data(cursor, yesterday_utc_str, chat_ids)
+        usernames = {username for tracked_users in tracked_by_chat.values() for username, _display_name in tracked_users}
+        streaks = compute_report_streaks(cursor, yesterday_utc_str, sorted(usernames), update_streaks=True)
+        CONN.commit()
+    except Exception as e:
+        logging.error(f"Job: Failed to prepare daily report: {e}")
+        CONN.rollback()
+        return
 
-    # Негизги функцияны "Кечээки" деп чакыруу
-    for (chat_id,) in groups:
-        await generate_and_send_report(context, chat_id, yesterday_utc_str, "Кечээки")
+    # Жөнөтүү тармакка гана көз каранды, ошондуктан группаларга параллелдүү
+    # жөнөтөбүз. Semaphore Telegram'дын rate limit'инен ашпоо үчүн.
+    semaphore = asyncio.Semaphore(REPORT_MAX_CONCURRENT_SENDS)
+
+    async def send_group_report(chat_id: int, tracked_users: list):
+        messages = build_report_messages(
+            yesterday_utc_str, tracked_users, submissions_by_chat.get(chat_id, {}), streaks
+        )
+        async with semaphore:
+            try:
+                await asyncio.wait_for(
+                    send_report_messages(context, chat_id, yesterday_utc_str, messages),
+                    timeout=REPORT_SEND_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                logging.error(f"Job: Timed out sending report to group {chat_id}")
+
+    sends = []
+    for chat_id in chat_ids:
+        tracked_users = tracked_by_chat.get(chat_id)
+        if not tracked_users:
+            logging.info(f"Job: No tracked users in group {chat_id}. No report sent.")
+            continue
+        sends.append(send_group_report(chat_id, tracked_users))
+    await asyncio.gather(*sends)
 
 async def clear_daily_log(context: ContextTypes.DEFAULT_TYPE):
     """
@@ -636,48 +985,99 @@ async def clear_daily_log(context: ContextTypes.DEFAULT_TYPE):
     Мисалы, 2 күндөн эски маалыматтарды.
     """
     logging.info("Job: Running daily cleanup...")
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    cursor = CONN.cursor()
 
     two_days_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=2)
     two_days_ago_str = two_days_ago.strftime('%Y-%m-%d')
 
     try:
-        cursor.execute("DELETE FROM posted_today WHERE date_posted < ?", (two_days_ago_str,))
-        conn.commit()
+        with CONN:
+            cursor.execute("DELETE FROM posted_today WHERE date_posted < ?", (two_days_ago_str,))
         logging.info(f"Job: Cleaned up {cursor.rowcount} old entries from posted_today table.")
     except Exception as e:
         logging.error(f"Job: Failed to clear daily log: {e}")
-    finally:
-        conn.close()
 
-def get_or_fetch_problem_info(db_cursor, problem_slug: str) -> (str, str):
+async def bulk_get_or_fetch_problem_info(db_cursor, problem_slugs, semaphore=None) -> dict:
     """
-    Маалымат базасынан маселенин маалыматын (кыйынчылык, аталышы) текшерет.
-    Табылбаса, API'ден алып, маалымат базасына сактайт.
+    Маселелердин маалыматын (кыйынчылык, аталышы) топтоп алат: {slug: (difficulty, title)} кайтарат.
+    Эс тутумдагы кэште жоктору бир SELECT менен DB'ден, калгандары API'ден
+    (LEETCODE_PROBLEMS_BATCH_SIZE өлчөмүндөгү топтор менен, параллелдүү)
+    алынат жана бир executemany менен problem_info'го кошулат.
+    API суроолору 'semaphore' менен чектелет (берилбесе, жаңы
+    LEETCODE_MAX_CONCURRENT_REQUESTS semaphore түзүлөт).
+    commit'ти чакырган функция өзү жасайт.
     """
-    # 1. Кэшти текшерүү
-    db_cursor.execute("SELECT difficulty, title FROM problem_info WHERE problem_slug = ?", (problem_slug,))
-    result = db_cursor.fetchone()
+    problem_info = {}
+    missing_slugs = set()
+    for problem_slug in problem_slugs:
+        cached = _PROBLEM_INFO_CACHE.get(problem_slug)
+        if cached is not None:
+            _PROBLEM_INFO_CACHE.move_to_end(problem_slug)
+            problem_info[problem_slug] = cached
+        else:
+            missing_slugs.add(problem_slug)
 
-    if result:
-        return (result[0], result[1])  # (difficulty, title)
+    if missing_slugs:
+        # The slug list is bound as one JSON array so the SQL text (and its
+        # cached prepared statement) is the same no matter how many slugs there are.
+        db_cursor.execute(
+            "SELECT problem_slug, difficulty, title FROM problem_info "
+            "WHERE problem_slug IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(missing_slugs)),)
+        )
+        for problem_slug, difficulty, title in db_cursor.fetchall():
+            problem_info[problem_slug] = _remember_problem_info(problem_slug, (difficulty, title))
+            missing_slugs.discard(problem_slug)
+
+    missing_slugs = sorted(missing_slugs)
+    for problem_slug in missing_slugs:
+        logging.info(f"Cache miss. Fetching info for {problem_slug} from API...")
+    batches = [
+        missing_slugs[start:start + LEETCODE_PROBLEMS_BATCH_SIZE]
+        for start in range(0, len(missing_slugs), LEETCODE_PROBLEMS_BATCH_SIZE)
+    ]
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LEETCODE_MAX_CONCURRENT_REQUESTS)
+
+    async def fetch_batch(batch: list):
+        async with semaphore:
+            return await asyncio.to_thread(fetch_problem_difficulties_bulk, batch)
+
+    fetched_batches = await asyncio.gather(
+        *(fetch_batch(batch) for batch in batches),
+        return_exceptions=True
+    )
 
-    # 2. Кэште жок, API'ден алуу
-    logging.info(f"Cache miss. Fetching info for {problem_slug} from API...")
-    difficulty, title = fetch_problem_difficulty(problem_slug)
+    fetched_info = {}
+    for batch, batch_info in zip(batches, fetched_batches):
+        if isinstance(batch_info, Exception):
+            logging.error(f"Error fetching problem info for {batch}: {batch_info}")
+            continue
+        fetched_info.update(batch_info)
+
+    new_rows = []
+    for problem_slug in missing_slugs:
+        difficulty, title = fetched_info.get(problem_slug, (None, None))
+        if difficulty and title:
+            new_rows.append((problem_slug, difficulty, title))
+            problem_info[problem_slug] = _remember_problem_info(problem_slug, (difficulty, title))
+        else:
+            problem_info[problem_slug] = ("N/A", problem_slug) # Эгер API иштебесе
 
-    if difficulty and title:
-        # 3. Кэшке (маалымат базасына) сактоо
-        try:
-            db_cursor.execute("INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
-                              (problem_slug, difficulty, title))
-            # conn.commit() бул жерде чакырылбайт, чакырган функция өзү commit кылат
-        except sqlite3.IntegrityError:
-            pass # Эгер башка процесс кошуп койсо
-        return (difficulty, title)
-    else:
-        return ("N/A", problem_slug) # Эгер API иштебесе
+    if new_rows:
+        db_cursor.executemany(
+            "INSERT OR IGNORE INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+            new_rows
+        )
+    return problem_info
+
+def _remember_problem_info(problem_slug: str, info: (str, str)) -> (str, str):
+    """Stores problem info in the in-process LRU, evicting the oldest entry when full."""
+    _PROBLEM_INFO_CACHE[problem_slug] = info
+    _PROBLEM_INFO_CACHE.move_to_end(problem_slug)
+    if len(_PROBLEM_INFO_CACHE) > PROBLEM_INFO_CACHE_SIZE:
+        _PROBLEM_INFO_CACHE.popitem(last=False)
+    return info
 
 def format_streak_label(streak_value: int) -> str:
     """Formats streak label for display."""
@@ -685,46 +1085,23 @@ def format_streak_label(streak_value: int) -> str:
         return f" (🔥 +{streak_value})"
     return f" (❄️ {streak_value})"
 
-def get_current_user_streak(db_cursor, username: str) -> (int, bool):
-    """
-    Returns the current stored streak without mutating user_streaks.
-    Returns (streak_value, show_streak_flag).
-    """
-    db_cursor.execute(
-        "SELECT streak_value FROM user_streaks WHERE leetcode_username = ?",
-        (username,)
-    )
-    row = db_cursor.fetchone()
-    if not row:
-        return 0, False
-    return row[0], True
-
-def update_user_streak(db_cursor, username: str, date_str: str, solved_today: bool) -> (int, bool):
+def compute_next_streak(stored, date_str: str, solved_today: bool) -> (int, bool):
     """
-    Updates and returns user's streak for given date.
-    Returns (streak_value, show_streak_flag).
+    Computes a user's streak for the given date from the stored
+    (last_date, streak_value) row, or None if the user has no streak yet.
+    Returns (streak_value, changed); 'changed' is False when the stored row
+    is already at or past date_str and must be left as is.
     """
-    db_cursor.execute(
-        "SELECT last_date, streak_value FROM user_streaks WHERE leetcode_username = ?",
-        (username,)
-    )
-    existing = db_cursor.fetchone()
-    current_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+    if not stored:
+        return (1 if solved_today else -1), True
 
-    if not existing:
-        new_streak = 1 if solved_today else -1
-        db_cursor.execute(
-            "INSERT INTO user_streaks (leetcode_username, last_date, streak_value) VALUES (?, ?, ?)",
-            (username, date_str, new_streak)
-        )
-        return new_streak, True
-
-    last_date_str, streak_value = existing
-    last_date = datetime.datetime.strptime(last_date_str, "%Y-%m-%d").date()
+    last_date_str, streak_value = stored
+    current_date = datetime.date.fromisoformat(date_str)
+    last_date = datetime.date.fromisoformat(last_date_str)
     day_delta = (current_date - last_date).days
 
     if day_delta <= 0:
-        return streak_value, True
+        return streak_value, False
 
     if day_delta != 1:
         new_streak = 1 if solved_today else -1
@@ -732,42 +1109,23 @@ def update_user_streak(db_cursor, username: str, date_str: str, solved_today: bo
         new_streak = streak_value + 1 if streak_value > 0 else 1
     else:
         new_streak = streak_value - 1 if streak_value < 0 else -1
-
-    db_cursor.execute(
-        "UPDATE user_streaks SET last_date = ?, streak_value = ? WHERE leetcode_username = ?",
-        (date_str, new_streak, username)
-    )
     return new_streak, True
 
-def get_or_fetch_difficulty(db_cursor, problem_slug: str) -> str:
-    """
-    Checks the DB for a problem's difficulty.
-    If not found, fetches from LeetCode API and saves it.
-    """
-    # 1. Check cache first
-    db_cursor.execute("SELECT difficulty FROM problem_difficulty WHERE problem_slug = ?", (problem_slug,))
-    result = db_cursor.fetchone()
-
-    if result:
-        return result[0]  # Return difficulty from cache
-
-    # 2. Not in cache, fetch from API
-    logging.info(f"Cache miss. Fetching difficulty for {problem_slug} from API...")
-    difficulty = fetch_problem_difficulty(problem_slug)
-
-    if difficulty:
-        # 3. Save to cache (database)
-        try:
-            db_cursor.execute("INSERT INTO problem_difficulty (problem_slug, difficulty) VALUES (?, ?)",
-                              (problem_slug, difficulty))
-        except sqlite3.IntegrityError:
-            pass  # Should not happen, but good to handle
-        return difficulty
-    else:
-        return "N/A" # Default if API fails
+def save_user_streaks(db_cursor, rows):
+    """Upserts (leetcode_username, last_date, streak_value) rows in one statement."""
+    db_cursor.executemany(
+        "INSERT INTO user_streaks (leetcode_username, last_date, streak_value) VALUES (?, ?, ?) "
+        "ON CONFLICT (leetcode_username) DO UPDATE SET "
+        "last_date = excluded.last_date, streak_value = excluded.streak_value",
+        rows
+    )
 
 # --- Main Bot Function ---
 
+async def _close_db_on_shutdown(application: Application):
+    """Closes the shared connection so SQLite checkpoints the WAL on a clean stop."""
+    close_db()
+
 def main():
     """Ботту иштетет жана жумуштарды пландаштырат."""
     if TELEGRAM_BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
@@ -776,7 +1134,19 @@ def main():
 
     init_db()
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # HTTP/2 lets all Bot API calls share one multiplexed connection instead of
+    # opening new ones under bursty load (requires the h2 package).
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(True)
+        .http_version("2")
+        .get_updates_http_version("2")
+        .connection_pool_size(256)
+        .pool_timeout(5.0)
+        .post_shutdown(_close_db_on_shutdown)
+        .build()
+    )
 
     # --- JOB SCHEDULING ---
     job_queue = application.job_queue
@@ -796,15 +1166,16 @@ def main():
     logging.info(f"Scheduled daily report for {report_time} UTC.")
     logging.info(f"Scheduled daily cleanup for {cleanup_time} UTC.")
 
-    # Команда handler'лерин каттоо (эч өзгөрүү жок)
+    # Команда handler'лерин каттоо. Группа абалын өзгөрткөн буйруктар
+    # ар бир чат үчүн ырааттуу иштейт.
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("register_group", register_group_command))
-    application.add_handler(CommandHandler("add", add_user_command))
-    application.add_handler(CommandHandler("remove", remove_user_command))
-    application.add_handler(CommandHandler("list", list_users_command))
-    application.add_handler(CommandHandler("send_report", manual_send_report_command))
-    application.add_handler(CommandHandler("send_today", manual_send_today_command))
+    application.add_handler(CommandHandler("register_group", serialized_per_chat(register_group_command)))
+    application.add_handler(CommandHandler("add", serialized_per_chat(add_user_command)))
+    application.add_handler(CommandHandler("remove", serialized_per_chat(remove_user_command)))
+    application.add_handler(CommandHandler("list", serialized_per_chat(list_users_command)))
+    application.add_handler(CommandHandler("send_report", serialized_per_chat(manual_send_report_command)))
+    application.add_handler(CommandHandler("send_today", serialized_per_chat(manual_send_today_command)))
 
     logging.basicConfig(
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
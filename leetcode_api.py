@@ -1,10 +1,34 @@
 import requests
 import json
 import datetime
+import functools
+import logging
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
 
 # The URL for LeetCode's public GraphQL API
 LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql"
 
+# One session for the whole process so every request reuses pooled keep-alive
+# connections instead of paying a new TCP + TLS handshake. The pool is sized
+# for the bot's concurrent fetches (LEETCODE_MAX_CONCURRENT_REQUESTS in bot.py).
+# LeetCode's API may check for a user-agent and referer.
+_SESSION = requests.Session()
+# The GraphQL endpoint only looks at the Referer's origin, so one constant
+# value serves every query.
+_SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
+    "Referer": "https://leetcode.com/"
+})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Responses are parsed straight from the raw UTF-8 bytes (json.loads accepts
+# bytes), skipping requests' text decoding and charset detection. A malformed
+# body raises ValueError, which the fetchers treat like a failed request.
+def _parse_json(response):
+    return json.loads(response.content)
+
 # This is the GraphQL query we will send.
 # It asks for the 'recentAcSubmissionList' for a given 'username' and 'limit'.
 # We are requesting the problem's title, its unique 'titleSlug', and the 'timestamp'
@@ -19,6 +43,24 @@ query getRecentAcSubmissionList($username: String!, $limit: Int!) {
   }
 }
 """
+# Template for one aliased field of the bulk submissions query. Each user gets
+# its own alias (u0, u1, ...) so a single POST returns every user's list.
+BULK_SUBMISSIONS_FIELD = """
+  u{index}: recentAcSubmissionList(username: $u{index}, limit: $limit) {{
+    id
+    title
+    titleSlug
+    timestamp
+  }}"""
+
+# The bulk query documents depend only on the batch size, and the bot sends
+# nearly every batch at the same size, so each document is built once.
+@functools.lru_cache(maxsize=None)
+def _bulk_submissions_query(count: int) -> str:
+    signature = ", ".join(f"$u{index}: String!" for index in range(count))
+    fields = "".join(BULK_SUBMISSIONS_FIELD.format(index=index) for index in range(count))
+    return f"query getRecentAcSubmissionLists({signature}, $limit: Int!) {{{fields}\n}}"
+
 # This query gets details for a *single* problem, specified by its "titleSlug".
 QUESTION_DIFFICULTY_QUERY = """
 query questionData($titleSlug: String!) {
@@ -29,6 +71,20 @@ query questionData($titleSlug: String!) {
 }
 """
 
+# Template for one aliased field of the bulk problem query (q0, q1, ...).
+BULK_QUESTION_FIELD = """
+  q{index}: question(titleSlug: $s{index}) {{
+    difficulty
+    title
+  }}"""
+
+@functools.lru_cache(maxsize=None)
+def _bulk_question_query(count: int) -> str:
+    signature = ", ".join(f"$s{index}: String!" for index in range(count))
+    fields = "".join(BULK_QUESTION_FIELD.format(index=index) for index in range(count))
+    return f"query questionDataBulk({signature}) {{{fields}\n}}"
+
+
 def fetch_recent_submissions(username: str, limit: int = 20):
     """
     Fetches the most recent 'limit' accepted submissions for a LeetCode user.
@@ -41,7 +97,7 @@ def fetch_recent_submissions(username: str, limit: int = 20):
         A list of submission dictionaries, or None if the request fails
         or the user is not found.
     """
-    print(f"Attempting to fetch submissions for: {username}...")
+    logger.debug("Attempting to fetch submissions for: %s...", username)
 
     # This is the payload that will be sent as JSON in the POST request.
     # It specifies the query to run and the variables (username, limit)
@@ -55,47 +111,110 @@ def fetch_recent_submissions(username: str, limit: int = 20):
     }
 
     try:
-        # We use a session for connection pooling and to set common headers
-        with requests.Session() as s:
-            # LeetCode's API may check for a user-agent and referer
-            s.headers.update({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
-                "Referer": f"https://leetcode.com/{username}/"
-            })
-
-            response = s.post(LEETCODE_GRAPHQL_URL, json=json_payload)
-
-            # Check if the request was successful
-            if response.status_code == 200:
-                data = response.json()
-
-                # Check for errors in the GraphQL response itself
-                if "errors" in data:
-                    print(f"Error in GraphQL response for {username}: {data['errors']}")
-                    return None
-
-                # Navigate to the data we want
-                submissions = data.get("data", {}).get("recentAcSubmissionList")
-
-                if submissions is None:
-                    # This can happen if the user doesn't exist or has no submissions
-                    print(f"No submission data found for user: {username}")
-                    return []
-
-                print(f"Successfully fetched {len(submissions)} submissions for {username}.")
-                return submissions
-            else:
-                print(f"Failed to fetch data. Status code: {response.status_code}")
-                print(f"Response: {response.text}")
+        # The shared session pools connections and carries the headers
+        response = _SESSION.post(LEETCODE_GRAPHQL_URL, json=json_payload)
+
+        # Check if the request was successful; an empty body (Content-Length: 0) has nothing to parse
+        if response.ok and response.content:
+            data = _parse_json(response)
+
+            # Check for errors in the GraphQL response itself
+            if "errors" in data:
+                logger.warning("Error in GraphQL response for %s: %s", username, data["errors"])
                 return None
 
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred during the request: {e}")
+            # Navigate to the data we want; a missing or null "data" means no submissions
+            try:
+                submissions = data["data"]["recentAcSubmissionList"]
+            except (KeyError, TypeError):
+                submissions = None
+
+            if submissions is None:
+                # This can happen if the user doesn't exist or has no submissions
+                logger.debug("No submission data found for user: %s", username)
+                return []
+
+            logger.debug("Successfully fetched %d submissions for %s.", len(submissions), username)
+            return submissions
+        else:
+            logger.warning("Failed to fetch data. Status code: %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response: %s", response.text)
+            return None
+
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("An error occurred during the request: %s", e)
         return None
 
+def fetch_recent_submissions_bulk(usernames: list, limit: int = 20):
+    """
+    Fetches the most recent 'limit' accepted submissions for several LeetCode
+    users with a single aliased GraphQL request. Callers should keep batches
+    small (about 20 users) to stay under LeetCode's query complexity limits.
+
+    Args:
+        usernames: The LeetCode usernames.
+        limit: The number of recent submissions to fetch per user.
+
+    Returns:
+        A dict mapping each username to its list of submission dictionaries,
+        or to None if the request (or that user's part of it) failed.
+    """
+    if not usernames:
+        return {}
+
+    variables = {f"u{index}": username for index, username in enumerate(usernames)}
+    variables["limit"] = limit
+    json_payload = {
+        "query": _bulk_submissions_query(len(usernames)),
+        "variables": variables
+    }
+    failed = dict.fromkeys(usernames)
+
+    try:
+        response = _SESSION.post(LEETCODE_GRAPHQL_URL, json=json_payload)
+
+        if not response.ok or not response.content:
+            logger.warning("Failed to fetch bulk data. Status code: %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response: %s", response.text)
+            return failed
+
+        data = _parse_json(response)
+
+        # Errors carry the alias of the failing field in their path; an
+        # error without a path means the whole query was rejected.
+        failed_aliases = set()
+        for error in data.get("errors") or []:
+            path = error.get("path")
+            if not path:
+                logger.warning("Error in bulk GraphQL response: %s", data["errors"])
+                return failed
+            failed_aliases.add(path[0])
+
+        results = data.get("data") or {}
+        submissions_by_user = {}
+        for index, username in enumerate(usernames):
+            alias = f"u{index}"
+            if alias in failed_aliases:
+                logger.warning("Error in GraphQL response for %s", username)
+                submissions_by_user[username] = None
+            else:
+                # Missing data means the user doesn't exist or has no submissions
+                submissions_by_user[username] = results.get(alias) or []
+
+        logger.debug("Successfully fetched submissions for %d users in one request.", len(usernames))
+        return submissions_by_user
+
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("An error occurred during the bulk request: %s", e)
+        return failed
+
 # --- Example Usage ---
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+
     # NOTE: Replace 'your_test_username' with a real LeetCode username
     # For example, a popular user like "neal_wu"
     TEST_USERNAME = "neal_wu"
@@ -138,35 +257,83 @@ def fetch_problem_difficulty(title_slug: str):
     }
 
     try:
-        with requests.Session() as s:
-            # ... (headers ошол бойдон калат) ...
-            s.headers.update({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
-                "Referer": f"https://leetcode.com/problems/{title_slug}/"
-            })
+        response = _SESSION.post(LEETCODE_GRAPHQL_URL, json=json_payload)
 
-            response = s.post(LEETCODE_GRAPHQL_URL, json=json_payload)
+        # An empty body (Content-Length: 0) has nothing to parse
+        if response.ok and response.content:
+            data = _parse_json(response)
 
-            if response.status_code == 200:
-                data = response.json()
+            if "errors" in data:
+                logger.warning("Error in GraphQL response for %s: %s", title_slug, data["errors"])
+                return (None, None)
 
-                if "errors" in data:
-                    print(f"Error in GraphQL response for {title_slug}: {data['errors']}")
-                    return (None, None)
+            try:
+                question_data = data["data"]["question"]
+            except (KeyError, TypeError):
+                question_data = None
 
-                question_data = data.get("data", {}).get("question")
+            if question_data:
+                difficulty = question_data.get("difficulty")
+                title = question_data.get("title")
+                if difficulty and title:
+                    return (difficulty, title)
 
-                if question_data:
-                    difficulty = question_data.get("difficulty")
-                    title = question_data.get("title")
-                    if difficulty and title:
-                        return (difficulty, title)
+            logger.warning("No difficulty/title data found for slug: %s", title_slug)
+            return (None, None)
+        else:
+            return (None, None)
 
-                print(f"No difficulty/title data found for slug: {title_slug}")
-                return (None, None)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("An error occurred during the request for difficulty: %s", e)
+        return (None, None)
+
+
+def fetch_problem_difficulties_bulk(title_slugs: list):
+    """
+    Fetches difficulty and title for several problems with a single aliased
+    GraphQL request. Callers should keep batches small (about 20 slugs).
+
+    Args:
+        title_slugs: The problems' unique URL slugs (e.g., "two-sum").
+
+    Returns:
+        A dict mapping each slug to a (difficulty, title) tuple such as
+        ("Easy", "Two Sum"), or to (None, None) if it could not be fetched.
+    """
+    if not title_slugs:
+        return {}
+
+    json_payload = {
+        "query": _bulk_question_query(len(title_slugs)),
+        "variables": {f"s{index}": title_slug for index, title_slug in enumerate(title_slugs)}
+    }
+    failed = dict.fromkeys(title_slugs, (None, None))
+
+    try:
+        response = _SESSION.post(LEETCODE_GRAPHQL_URL, json=json_payload)
+
+        if not response.ok or not response.content:
+            return failed
+
+        data = _parse_json(response)
+
+        # A failing alias still leaves the other problems' data usable
+        if "errors" in data:
+            logger.warning("Error in bulk GraphQL response for problems: %s", data["errors"])
+
+        results = data.get("data") or {}
+        problem_info = {}
+        for index, title_slug in enumerate(title_slugs):
+            question_data = results.get(f"q{index}") or {}
+            difficulty = question_data.get("difficulty")
+            title = question_data.get("title")
+            if difficulty and title:
+                problem_info[title_slug] = (difficulty, title)
             else:
-                return (None, None)
+                logger.warning("No difficulty/title data found for slug: %s", title_slug)
+                problem_info[title_slug] = (None, None)
+        return problem_info
 
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred during the request for difficulty: {e}")
-        return (None, None)
\ No newline at end of file
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("An error occurred during the bulk request for difficulty: %s", e)
+        return failed
@@ -1,7 +1,10 @@
+import asyncio
 import datetime
 import os
 import sqlite3
 import tempfile
+import threading
+import time
 import unittest
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
@@ -22,28 +25,88 @@ def make_update(chat_id=1, chat_type="group", username="tester"):
     return SimpleNamespace(message=message)
 
 
+def bulk_fetch(fetch_one):
+    """Builds a fake fetch_recent_submissions_bulk from a per-user fetch function."""
+    return lambda usernames, limit: {username: fetch_one(username) for username in usernames}
+
+
+def bulk_fetch_problems(fetch_one):
+    """Builds a fake fetch_problem_difficulties_bulk from a per-slug fetch function."""
+    return lambda slugs: {slug: fetch_one(slug) for slug in slugs}
+
+
+# Test databases live on tmpfs where available, so WAL writes and fsyncs never
+# touch the disk while the bot still sees a real file (WAL, several connections).
+_TEST_DB_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# One database file for the whole run: setUpModule builds the schema once and
+# each database test empties the tables again in tearDown.
+_TEST_DB_DIR = None
+_TEST_DB = None
+
+
+def setUpModule():
+    global _TEST_DB_DIR, _TEST_DB
+    _TEST_DB_DIR = tempfile.TemporaryDirectory(dir=_TEST_DB_ROOT)
+    _TEST_DB = os.path.join(_TEST_DB_DIR.name, "test.db")
+    original_db_name = bot.DB_NAME
+    bot.DB_NAME = _TEST_DB
+    try:
+        bot.init_db()
+    finally:
+        bot.close_db()
+        bot.DB_NAME = original_db_name
+
+
+def tearDownModule():
+    _TEST_DB_DIR.cleanup()
+
+
+def clear_test_db():
+    """Deletes every row from the shared test database in one transaction."""
+    conn = sqlite3.connect(_TEST_DB)
+    try:
+        with conn:
+            tables = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+            for (table_name,) in tables:
+                conn.execute(f'DELETE FROM "{table_name}"')
+    finally:
+        conn.close()
+
+
 class DatabaseTestMixin:
     def setUp(self):
-        self._temp_dir = tempfile.TemporaryDirectory()
         self._original_db_name = bot.DB_NAME
-        bot.DB_NAME = os.path.join(self._temp_dir.name, "test.db")
+        bot.DB_NAME = _TEST_DB
+        # The schema is already in place, so this only resets the bot's caches
+        # and connections (and recreates anything a migration test dropped)
         bot.init_db()
 
     def tearDown(self):
+        bot.close_db()
         bot.DB_NAME = self._original_db_name
-        self._temp_dir.cleanup()
+        clear_test_db()
 
     def connect(self):
         return sqlite3.connect(bot.DB_NAME)
 
 
 class TestStreakLogic(DatabaseTestMixin, unittest.TestCase):
+    def report_streak(self, cursor, date_str, solved):
+        """Runs alice's streak update for date_str as a report would."""
+        if solved:
+            cursor.execute(
+                "INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
+                (1, "alice", "two-sum", date_str),
+            )
+        return bot.compute_report_streaks(cursor, date_str, ["alice"], True)["alice"]
+
     def test_new_user_streak_created_with_visible_label(self):
         with self.connect() as conn:
             cursor = conn.cursor()
-            streak_value, show_label = bot.update_user_streak(
-                cursor, "alice", "2026-02-10", True
-            )
+            streak_value, show_label = self.report_streak(cursor, "2026-02-10", True)
             conn.commit()
 
             cursor.execute(
@@ -59,13 +122,9 @@ class TestStreakLogic(DatabaseTestMixin, unittest.TestCase):
     def test_streak_advances_and_flips_to_negative_after_miss(self):
         with self.connect() as conn:
             cursor = conn.cursor()
-            bot.update_user_streak(cursor, "alice", "2026-02-10", True)
-            day2_value, day2_show = bot.update_user_streak(
-                cursor, "alice", "2026-02-11", True
-            )
-            day3_value, day3_show = bot.update_user_streak(
-                cursor, "alice", "2026-02-12", False
-            )
+            self.report_streak(cursor, "2026-02-10", True)
+            day2_value, day2_show = self.report_streak(cursor, "2026-02-11", True)
+            day3_value, day3_show = self.report_streak(cursor, "2026-02-12", False)
             conn.commit()
 
             cursor.execute(
@@ -81,57 +140,116 @@ class TestStreakLogic(DatabaseTestMixin, unittest.TestCase):
     def test_non_consecutive_day_resets_streak(self):
         with self.connect() as conn:
             cursor = conn.cursor()
-            bot.update_user_streak(cursor, "alice", "2026-02-10", True)
-            reset_value, show_label = bot.update_user_streak(
-                cursor, "alice", "2026-02-15", False
-            )
+            self.report_streak(cursor, "2026-02-10", True)
+            reset_value, show_label = self.report_streak(cursor, "2026-02-15", False)
             conn.commit()
 
         self.assertEqual((reset_value, show_label), (-1, True))
 
+    def test_next_streak_leaves_same_or_older_date_unchanged(self):
+        self.assertEqual(bot.compute_next_streak(("2026-02-10", 3), "2026-02-10", False), (3, False))
+        self.assertEqual(bot.compute_next_streak(("2026-02-10", 3), "2026-02-09", True), (3, False))
+        self.assertEqual(bot.compute_next_streak(None, "2026-02-10", False), (-1, True))
+
 
 class TestProblemInfoCache(DatabaseTestMixin, unittest.TestCase):
-    def test_cache_hit_skips_api_fetch(self):
+    def test_init_db_prewarms_memory_cache(self):
         with self.connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+            conn.execute(
                 "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
                 ("two-sum", "Easy", "Two Sum"),
             )
             conn.commit()
 
-            with patch("bot.fetch_problem_difficulty") as fetch_mock:
-                result = bot.get_or_fetch_problem_info(cursor, "two-sum")
+        bot.init_db()
 
-        self.assertEqual(result, ("Easy", "Two Sum"))
-        fetch_mock.assert_not_called()
+        self.assertEqual(bot._PROBLEM_INFO_CACHE.get("two-sum"), ("Easy", "Two Sum"))
+
+    def test_bulk_lookup_hit_keeps_slug_from_lru_eviction(self):
+        with patch("bot.PROBLEM_INFO_CACHE_SIZE", 2):
+            bot._remember_problem_info("two-sum", ("Easy", "Two Sum"))
+            bot._remember_problem_info("3sum", ("Medium", "3Sum"))
+
+            # A hit on the oldest slug makes "3sum" the least recently used
+            result = asyncio.run(bot.bulk_get_or_fetch_problem_info(None, {"two-sum"}))
+            bot._remember_problem_info("n-queens", ("Hard", "N-Queens"))
+
+        self.assertEqual(result, {"two-sum": ("Easy", "Two Sum")})
+        self.assertEqual(list(bot._PROBLEM_INFO_CACHE), ["two-sum", "n-queens"])
 
-    def test_cache_miss_fetches_and_persists(self):
+
+class TestBulkProblemInfo(DatabaseTestMixin, unittest.IsolatedAsyncioTestCase):
+    async def test_bulk_lookup_combines_database_hits_and_api_fetches(self):
         with self.connect() as conn:
-            cursor = conn.cursor()
-            with patch(
-                "bot.fetch_problem_difficulty", return_value=("Medium", "Three Sum")
-            ) as fetch_mock:
-                result = bot.get_or_fetch_problem_info(cursor, "3sum")
+            conn.execute(
+                "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+                ("two-sum", "Easy", "Two Sum"),
+            )
             conn.commit()
 
-            cursor.execute(
-                "SELECT difficulty, title FROM problem_info WHERE problem_slug = ?",
-                ("3sum",),
-            )
-            db_row = cursor.fetchone()
+        def fake_fetch(slug):
+            return ("Medium", "Three Sum") if slug == "3sum" else (None, None)
 
-        self.assertEqual(result, ("Medium", "Three Sum"))
-        self.assertEqual(db_row, ("Medium", "Three Sum"))
-        fetch_mock.assert_called_once_with("3sum")
+        cursor = bot.CONN.cursor()
+        with patch("bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(fake_fetch)) as fetch_mock:
+            result = await bot.bulk_get_or_fetch_problem_info(
+                cursor, {"two-sum", "3sum", "missing-problem"}
+            )
+        bot.CONN.commit()
 
-    def test_api_failure_falls_back_to_slug(self):
+        self.assertEqual(
+            result,
+            {
+                "two-sum": ("Easy", "Two Sum"),
+                "3sum": ("Medium", "Three Sum"),
+                "missing-problem": ("N/A", "missing-problem"),
+            },
+        )
+        fetch_mock.assert_called_once_with(["3sum", "missing-problem"])
         with self.connect() as conn:
-            cursor = conn.cursor()
-            with patch("bot.fetch_problem_difficulty", return_value=(None, None)):
-                result = bot.get_or_fetch_problem_info(cursor, "missing-problem")
+            rows = conn.execute(
+                "SELECT problem_slug FROM problem_info ORDER BY problem_slug"
+            ).fetchall()
+        self.assertEqual(rows, [("3sum",), ("two-sum",)])
 
-        self.assertEqual(result, ("N/A", "missing-problem"))
+    async def test_bulk_lookup_serves_committed_rows_from_memory_cache(self):
+        with patch(
+            "bot.fetch_problem_difficulties_bulk",
+            side_effect=bulk_fetch_problems(lambda slug: ("Hard", "N-Queens")),
+        ) as fetch_mock:
+            first = await bot.bulk_get_or_fetch_problem_info(bot.CONN.cursor(), {"n-queens"})
+            bot.CONN.commit()
+            second = await bot.bulk_get_or_fetch_problem_info(None, {"n-queens"})
+
+        self.assertEqual(first, {"n-queens": ("Hard", "N-Queens")})
+        self.assertEqual(second, {"n-queens": ("Hard", "N-Queens")})
+        fetch_mock.assert_called_once_with(["n-queens"])
+
+    async def test_bulk_lookup_caps_concurrent_api_batches(self):
+        in_flight = 0
+        max_in_flight = 0
+        counter_lock = threading.Lock()
+
+        def slow_fetch(slugs):
+            nonlocal in_flight, max_in_flight
+            with counter_lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.02)
+            with counter_lock:
+                in_flight -= 1
+            return {slug: ("Easy", slug) for slug in slugs}
+
+        slugs = {f"problem-{i:02d}" for i in range(8)}
+        with patch("bot.LEETCODE_PROBLEMS_BATCH_SIZE", 1), patch(
+            "bot.LEETCODE_MAX_CONCURRENT_REQUESTS", 2
+        ), patch("bot.fetch_problem_difficulties_bulk", side_effect=slow_fetch) as fetch_mock:
+            result = await bot.bulk_get_or_fetch_problem_info(bot.CONN.cursor(), slugs)
+        bot.CONN.commit()
+
+        self.assertEqual(fetch_mock.call_count, 8)
+        self.assertEqual(set(result), slugs)
+        self.assertLessEqual(max_in_flight, 2)
 
 
 class TestMigrations(DatabaseTestMixin, unittest.TestCase):
@@ -178,6 +296,37 @@ class TestMigrations(DatabaseTestMixin, unittest.TestCase):
         self.assertEqual(posted_rows, [(77, "alice", "two-sum", "2026-02-10")])
         self.assertEqual(group_rows, [(77, "alice", "Alice")])
 
+    def test_migrate_legacy_tables_is_a_noop_once_a_group_exists(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO groups (chat_id) VALUES (?)", (77,))
+            bot.migrate_legacy_tables(cursor)
+
+            cursor.execute(
+                "INSERT INTO tracked_users (leetcode_username, display_name) VALUES (?, ?)",
+                ("alice", "Alice"),
+            )
+            bot.migrate_legacy_tables(cursor)
+            conn.commit()
+
+            cursor.execute("SELECT COUNT(*) FROM group_tracked_users")
+            group_user_count = cursor.fetchone()[0]
+
+        self.assertEqual(group_user_count, 0)
+
+
+class TestGroupRegistry(DatabaseTestMixin, unittest.TestCase):
+    def test_is_group_registered_falls_back_to_database_and_caches(self):
+        with self.connect() as conn:
+            conn.execute("INSERT INTO groups (chat_id) VALUES (?)", (88,))
+            conn.commit()
+
+        cursor = bot.CONN.cursor()
+        self.assertNotIn(88, bot._REGISTERED_GROUPS)
+        self.assertTrue(bot.is_group_registered(cursor, 88))
+        self.assertIn(88, bot._REGISTERED_GROUPS)
+        self.assertFalse(bot.is_group_registered(cursor, 89))
+
 
 class TestCommandHandlers(DatabaseTestMixin, unittest.IsolatedAsyncioTestCase):
     async def test_register_group_rejects_private_chats(self):
@@ -220,6 +369,16 @@ class TestCommandHandlers(DatabaseTestMixin, unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(remaining, 0)
 
+    async def test_add_user_twice_reports_already_tracked(self):
+        await bot.register_group_command(make_update(chat_id=556), SimpleNamespace())
+        await bot.add_user_command(make_update(chat_id=556), SimpleNamespace(args=["alice", "Alice"]))
+
+        update = make_update(chat_id=556)
+        await bot.add_user_command(update, SimpleNamespace(args=["alice", "Alice"]))
+
+        reply_text = update.message.reply_text.await_args.args[0]
+        self.assertIn("already being tracked", reply_text)
+
     async def test_add_user_requires_registered_group(self):
         update = make_update(chat_id=42, chat_type="group")
 
@@ -262,6 +421,58 @@ class TestCommandHandlers(DatabaseTestMixin, unittest.IsolatedAsyncioTestCase):
         self.assertFalse(report_mock.await_args.kwargs["update_streaks"])
 
 
+class TestReportSplitting(unittest.TestCase):
+    def test_split_report_blocks_packs_blocks_without_breaking_them(self):
+        blocks = ["a" * 4, "b" * 4, "c" * 4, "d" * 9]
+
+        messages = bot.split_report_blocks(blocks, limit=9)
+
+        self.assertEqual(messages, ["aaaabbbb", "cccc", "ddddddddd"])
+
+    def test_split_report_blocks_keeps_short_report_in_one_message(self):
+        self.assertEqual(bot.split_report_blocks(["x", "y"]), ["xy"])
+
+
+class TestPerChatSerialization(unittest.IsolatedAsyncioTestCase):
+    async def test_same_chat_runs_in_order_other_chats_run_concurrently(self):
+        events = []
+        release = asyncio.Event()
+
+        async def handler(update, context):
+            events.append(("start", update.effective_chat.id, context))
+            if context == "first":
+                await release.wait()
+            events.append(("end", update.effective_chat.id, context))
+
+        wrapped = bot.serialized_per_chat(handler)
+
+        def chat_update(chat_id):
+            return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id))
+
+        first = asyncio.create_task(wrapped(chat_update(1), "first"))
+        second = asyncio.create_task(wrapped(chat_update(1), "second"))
+        other = asyncio.create_task(wrapped(chat_update(2), "other"))
+        await asyncio.sleep(0)
+        await other
+
+        self.assertIn(("end", 2, "other"), events)
+        self.assertNotIn(("start", 1, "second"), events)
+
+        release.set()
+        await asyncio.gather(first, second)
+
+        chat_one = [event for event in events if event[1] == 1]
+        self.assertEqual(
+            chat_one,
+            [
+                ("start", 1, "first"),
+                ("end", 1, "first"),
+                ("start", 1, "second"),
+                ("end", 1, "second"),
+            ],
+        )
+
+
 class TestCollectorAndReports(DatabaseTestMixin, unittest.IsolatedAsyncioTestCase):
     async def test_check_for_updates_inserts_only_new_todays_submissions(self):
         with self.connect() as conn:
@@ -284,8 +495,10 @@ class TestCollectorAndReports(DatabaseTestMixin, unittest.IsolatedAsyncioTestCas
             },
         ]
 
-        with patch("bot.fetch_recent_submissions", return_value=submissions), patch(
-            "bot.get_or_fetch_problem_info", return_value=("Easy", "Two Sum")
+        with patch(
+            "bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(lambda username: submissions)
+        ), patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
         ) as problem_info_mock:
             await bot.check_for_updates(SimpleNamespace())
             await bot.check_for_updates(SimpleNamespace())
@@ -296,10 +509,234 @@ class TestCollectorAndReports(DatabaseTestMixin, unittest.IsolatedAsyncioTestCas
             total_rows = cursor.fetchone()[0]
             cursor.execute("SELECT problem_slug FROM posted_today")
             slug_rows = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT problem_slug, difficulty, title FROM problem_info")
+            problem_rows = cursor.fetchall()
 
         self.assertEqual(total_rows, 1)
         self.assertEqual(slug_rows, ["two-sum"])
-        self.assertEqual(problem_info_mock.call_count, 1)
+        self.assertEqual(problem_rows, [("two-sum", "Easy", "Two Sum")])
+        problem_info_mock.assert_called_once_with(["two-sum"])
+
+    async def test_check_for_updates_skips_tick_while_previous_run_in_flight(self):
+        with patch("bot._collect_submissions", new=AsyncMock()) as collect_mock:
+            async with bot._COLLECTOR_LOCK:
+                await bot.check_for_updates(SimpleNamespace())
+            collect_mock.assert_not_awaited()
+
+            await bot.check_for_updates(SimpleNamespace())
+            collect_mock.assert_awaited_once()
+
+    async def test_check_for_updates_skips_api_for_problems_in_database(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO groups (chat_id) VALUES (?)", (1004,))
+            cursor.execute(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                (1004, "alice", "Alice"),
+            )
+            cursor.execute(
+                "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+                ("two-sum", "Easy", "Two Sum"),
+            )
+            conn.commit()
+
+        now_ts = str(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+        submissions = [{"timestamp": now_ts, "titleSlug": "two-sum"}]
+
+        with patch(
+            "bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(lambda username: submissions)
+        ), patch(
+            "bot.fetch_problem_difficulties_bulk"
+        ) as fetch_mock:
+            await bot.check_for_updates(SimpleNamespace())
+
+        fetch_mock.assert_not_called()
+        self.assertEqual(bot._PROBLEM_INFO_CACHE.get("two-sum"), ("Easy", "Two Sum"))
+
+    async def test_check_for_updates_dedupes_repeated_slug_in_one_fetch(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO groups (chat_id) VALUES (?)", (1003,))
+            cursor.execute(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                (1003, "alice", "Alice"),
+            )
+            conn.commit()
+
+        now_ts = str(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+        submissions = [
+            {"timestamp": now_ts, "titleSlug": "two-sum"},
+            {"timestamp": now_ts, "titleSlug": "two-sum"},
+        ]
+
+        with patch(
+            "bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(lambda username: submissions)
+        ), patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
+        ):
+            await bot.check_for_updates(SimpleNamespace())
+
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM posted_today")
+            total_rows = cursor.fetchone()[0]
+
+        self.assertEqual(total_rows, 1)
+
+    async def test_check_for_updates_fetches_shared_user_once_for_all_groups(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT INTO groups (chat_id) VALUES (?)", [(2001,), (2002,)])
+            cursor.executemany(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                [(2001, "alice", "Alice"), (2002, "alice", "Alice")],
+            )
+            conn.commit()
+
+        now_ts = str(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+        submissions = [{"timestamp": now_ts, "titleSlug": "two-sum"}]
+
+        with patch(
+            "bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(lambda username: submissions)
+        ) as fetch_mock, patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
+        ):
+            await bot.check_for_updates(SimpleNamespace())
+
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT chat_id, leetcode_username, problem_slug FROM posted_today ORDER BY chat_id"
+            ).fetchall()
+
+        fetch_mock.assert_called_once_with(["alice"], limit=15)
+        self.assertEqual(rows, [(2001, "alice", "two-sum"), (2002, "alice", "two-sum")])
+
+    async def test_check_for_updates_skips_groups_without_newer_submissions(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT INTO groups (chat_id) VALUES (?)", [(2001,), (2002,)])
+            cursor.execute(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                (2001, "alice", "Alice"),
+            )
+            conn.commit()
+
+        now_ts = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+        submissions = [{"timestamp": str(now_ts), "titleSlug": "two-sum"}]
+
+        with patch(
+            "bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(lambda username: submissions)
+        ), patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
+        ):
+            await bot.check_for_updates(SimpleNamespace())
+
+            # Group 2001 already saw this submission; only the new group picks it up.
+            with self.connect() as conn:
+                conn.execute("DELETE FROM posted_today")
+                conn.execute(
+                    "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                    (2002, "alice", "Alice"),
+                )
+                conn.commit()
+            await bot.check_for_updates(SimpleNamespace())
+
+        with self.connect() as conn:
+            rows = conn.execute("SELECT chat_id, problem_slug FROM posted_today").fetchall()
+            last_seen = conn.execute(
+                "SELECT chat_id, last_seen_ts FROM group_tracked_users ORDER BY chat_id"
+            ).fetchall()
+
+        self.assertEqual(rows, [(2002, "two-sum")])
+        self.assertEqual(last_seen, [(2001, now_ts), (2002, now_ts)])
+
+    async def test_check_for_updates_retries_rows_from_failed_tick(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO groups (chat_id) VALUES (?)", (2001,))
+            cursor.execute(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                (2001, "alice", "Alice"),
+            )
+            conn.commit()
+
+        now_ts = str(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+        submissions = [{"timestamp": now_ts, "titleSlug": "two-sum"}]
+
+        with patch(
+            "bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(lambda username: submissions)
+        ), patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
+        ):
+            with patch("bot.bulk_get_or_fetch_problem_info", side_effect=RuntimeError("boom")):
+                await bot.check_for_updates(SimpleNamespace())
+            await bot.check_for_updates(SimpleNamespace())
+
+        with self.connect() as conn:
+            rows = conn.execute("SELECT chat_id, problem_slug FROM posted_today").fetchall()
+
+        self.assertEqual(rows, [(2001, "two-sum")])
+
+    async def test_check_for_updates_fetches_users_in_batches_and_isolates_failed_batch(self):
+        usernames = [f"user{i:02d}" for i in range(bot.LEETCODE_SUBMISSIONS_BATCH_SIZE + 1)]
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO groups (chat_id) VALUES (?)", (1003,))
+            cursor.executemany(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                [(1003, username, username) for username in usernames],
+            )
+            conn.commit()
+
+        now_ts = str(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+        submissions = [{"timestamp": now_ts, "titleSlug": "two-sum"}]
+
+        def fake_bulk(batch, limit):
+            if len(batch) == 1:
+                raise RuntimeError("boom")
+            return {username: submissions for username in batch}
+
+        with patch("bot.fetch_recent_submissions_bulk", side_effect=fake_bulk) as fetch_mock, patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
+        ):
+            await bot.check_for_updates(SimpleNamespace())
+
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM posted_today")
+            total_rows = cursor.fetchone()[0]
+
+        self.assertEqual(fetch_mock.call_count, 2)
+        self.assertEqual(total_rows, bot.LEETCODE_SUBMISSIONS_BATCH_SIZE)
+
+    async def test_check_for_updates_isolates_failed_user_fetch(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO groups (chat_id) VALUES (?)", (1002,))
+            cursor.executemany(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                [(1002, "alice", "Alice"), (1002, "bob", "Bob")],
+            )
+            conn.commit()
+
+        now_ts = str(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+
+        def fake_fetch(username):
+            if username == "alice":
+                return None
+            return [{"timestamp": now_ts, "titleSlug": "two-sum"}]
+
+        with patch("bot.fetch_recent_submissions_bulk", side_effect=bulk_fetch(fake_fetch)), patch(
+            "bot.fetch_problem_difficulties_bulk", side_effect=bulk_fetch_problems(lambda slug: ("Easy", "Two Sum"))
+        ):
+            await bot.check_for_updates(SimpleNamespace())
+
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT leetcode_username FROM posted_today")
+            users = [row[0] for row in cursor.fetchall()]
+
+        self.assertEqual(users, ["bob"])
 
     async def test_generate_report_uses_global_streak_signal_across_groups(self):
         report_date = "2026-02-10"
@@ -419,6 +856,138 @@ class TestCollectorAndReports(DatabaseTestMixin, unittest.IsolatedAsyncioTestCas
             sent_text,
         )
 
+    def test_load_report_data_orders_problems_by_difficulty_not_insert_order(self):
+        report_date = "2026-02-10"
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                (1, "bob", "Bob"),
+            )
+            cursor.executemany(
+                "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+                [
+                    ("3sum", "Medium", "3Sum"),
+                    ("n-queens", "Hard", "N-Queens"),
+                    ("two-sum", "Easy", "Two Sum"),
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
+                [
+                    (1, "bob", "3sum", report_date),
+                    (1, "bob", "n-queens", report_date),
+                    (1, "bob", "two-sum", report_date),
+                ],
+            )
+            conn.commit()
+
+        _tracked_by_chat, submissions_by_chat = bot.load_report_data(
+            bot.CONN.cursor(), report_date, [1]
+        )
+
+        self.assertEqual(
+            submissions_by_chat[1]["bob"],
+            [
+                ("Easy", "two-sum", "Two Sum"),
+                ("Hard", "n-queens", "N-Queens"),
+                ("Medium", "3sum", "3Sum"),
+            ],
+        )
+
+    async def test_generate_report_keeps_pipe_characters_in_titles(self):
+        report_date = "2026-02-10"
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                (1, "bob", "Bob"),
+            )
+            cursor.executemany(
+                "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+                [
+                    ("two-sum", "Easy", "Two Sum"),
+                    ("odd-title", "Hard", "A | B Problem"),
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
+                [
+                    (1, "bob", "two-sum", report_date),
+                    (1, "bob", "odd-title", report_date),
+                ],
+            )
+            conn.commit()
+
+        send_message_mock = AsyncMock()
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message_mock))
+
+        await bot.generate_and_send_report(context, 1, report_date, "Today")
+
+        sent_text = send_message_mock.await_args.kwargs["text"]
+        self.assertIn(
+            "🔴 <a href='https://leetcode.com/problems/odd-title/'>A | B Problem</a>",
+            sent_text,
+        )
+        self.assertLess(sent_text.index("Two Sum"), sent_text.index("A | B Problem"))
+
+    async def test_generate_report_splits_long_report_on_user_boundaries(self):
+        report_date = "2026-02-10"
+        users = [(1, f"user{i:02d}", f"User {i:02d}") for i in range(40)]
+        problems = [(f"problem-{i}", "Medium", "A Fairly Long Problem Title " * 3) for i in range(5)]
+        posted = [
+            (1, username, slug, report_date)
+            for _chat_id, username, _display_name in users
+            for slug, _difficulty, _title in problems
+        ]
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                users,
+            )
+            cursor.executemany(
+                "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+                problems,
+            )
+            cursor.executemany(
+                "INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
+                posted,
+            )
+            conn.commit()
+
+        send_message_mock = AsyncMock()
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message_mock))
+
+        result = await bot.generate_and_send_report(context, 1, report_date, "Today")
+
+        self.assertTrue(result)
+        sent_texts = [call.kwargs["text"] for call in send_message_mock.await_args_list]
+        self.assertGreater(len(sent_texts), 1)
+        for text in sent_texts:
+            self.assertLessEqual(len(text), bot.REPORT_MESSAGE_LIMIT)
+        full_text = "".join(sent_texts)
+        for _chat_id, _username, display_name in users:
+            self.assertEqual(full_text.count(f"<b>{display_name} (🔥 +1)</b>:"), 1)
+
+    def test_split_report_never_ends_a_message_with_a_section_header(self):
+        report_date = "2026-02-10"
+        tracked_users = [(f"user{i:02d}", f"User {i:02d}".ljust(24, ".")) for i in range(28)]
+        tracked_users += [(f"sleeper{i}", f"Sleeper {i}".ljust(24, ".")) for i in range(5)]
+        streaks = {username: (1, True) for username, _display_name in tracked_users}
+        headers = (f"<b>{report_date}: Азаматтар</b>\n", f"<b>{report_date}: Уктап калгандар</b>\n")
+
+        # Varying the title length moves the split point across the section boundary
+        for title_length in range(1, 80):
+            submissions_by_user = {
+                f"user{i:02d}": [("Medium", f"problem-{j}", "T" * title_length) for j in range(3)]
+                for i in range(28)
+            }
+            messages = bot.build_report_messages(report_date, tracked_users, submissions_by_user, streaks)
+            with self.subTest(title_length=title_length):
+                for message in messages:
+                    self.assertFalse(message.endswith(headers))
+
     async def test_generate_report_returns_false_when_group_has_no_tracked_users(self):
         send_message_mock = AsyncMock()
         context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message_mock))
@@ -430,6 +999,70 @@ class TestCollectorAndReports(DatabaseTestMixin, unittest.IsolatedAsyncioTestCas
         self.assertFalse(result)
         send_message_mock.assert_not_awaited()
 
+    async def test_send_daily_report_sends_each_group_its_own_report(self):
+        yesterday = (
+            datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
+        ).strftime("%Y-%m-%d")
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT INTO groups (chat_id) VALUES (?)", [(1,), (2,), (3,)])
+            cursor.executemany(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                [(1, "alice", "Alice"), (2, "alice", "Alice"), (2, "bob", "Bob")],
+            )
+            cursor.execute(
+                "INSERT INTO problem_info (problem_slug, difficulty, title) VALUES (?, ?, ?)",
+                ("two-sum", "Easy", "Two Sum"),
+            )
+            cursor.execute(
+                "INSERT INTO posted_today (chat_id, leetcode_username, problem_slug, date_posted) VALUES (?, ?, ?, ?)",
+                (1, "alice", "two-sum", yesterday),
+            )
+            conn.commit()
+
+        send_message_mock = AsyncMock()
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message_mock))
+
+        await bot.send_daily_report(context)
+
+        sent = {call.kwargs["chat_id"]: call.kwargs["text"] for call in send_message_mock.await_args_list}
+        self.assertEqual(sorted(sent), [1, 2])
+        self.assertIn("Two Sum", sent[1])
+        self.assertNotIn("Two Sum", sent[2])
+        self.assertIn("<b>Alice (🔥 +1)</b>", sent[2])
+        self.assertIn("<b>Bob (❄️ -1)</b>", sent[2])
+
+        with self.connect() as conn:
+            streak_rows = conn.execute(
+                "SELECT leetcode_username, streak_value FROM user_streaks ORDER BY leetcode_username"
+            ).fetchall()
+
+        self.assertEqual(streak_rows, [("alice", 1), ("bob", -1)])
+
+    async def test_send_daily_report_times_out_stuck_group_without_blocking_others(self):
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT INTO groups (chat_id) VALUES (?)", [(1,), (2,)])
+            cursor.executemany(
+                "INSERT INTO group_tracked_users (chat_id, leetcode_username, display_name) VALUES (?, ?, ?)",
+                [(1, "alice", "Alice"), (2, "bob", "Bob")],
+            )
+            conn.commit()
+
+        async def fake_send_message(chat_id, **kwargs):
+            if chat_id == 1:
+                await asyncio.sleep(60)
+
+        send_message_mock = AsyncMock(side_effect=fake_send_message)
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message_mock))
+
+        with patch("bot.REPORT_SEND_TIMEOUT_SECONDS", 0.05):
+            await asyncio.wait_for(bot.send_daily_report(context), timeout=5)
+
+        self.assertEqual(
+            sorted(call.kwargs["chat_id"] for call in send_message_mock.await_args_list), [1, 2]
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
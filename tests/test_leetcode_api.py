@@ -0,0 +1,172 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import requests
+
+import leetcode_api
+
+
+def make_response(payload=None, status_code=200):
+    content = b"" if payload is None else json.dumps(payload).encode()
+    return SimpleNamespace(
+        ok=status_code < 400,
+        status_code=status_code,
+        content=content,
+        text=content.decode(),
+    )
+
+
+def submission(slug):
+    return {"id": "1", "title": slug.title(), "titleSlug": slug, "timestamp": "1770681600"}
+
+
+class TestBulkSubmissionsQuery(unittest.TestCase):
+    def test_query_declares_and_aliases_one_field_per_user(self):
+        query = leetcode_api._bulk_submissions_query(2)
+
+        self.assertIn(
+            "query getRecentAcSubmissionLists($u0: String!, $u1: String!, $limit: Int!)",
+            query,
+        )
+        self.assertIn("u0: recentAcSubmissionList(username: $u0, limit: $limit)", query)
+        self.assertIn("u1: recentAcSubmissionList(username: $u1, limit: $limit)", query)
+        self.assertNotIn("$u2", query)
+
+
+class TestFetchRecentSubmissionsBulk(unittest.TestCase):
+    def fetch(self, response, usernames=("alice", "bob")):
+        with patch.object(leetcode_api._SESSION, "post", return_value=response) as post_mock:
+            result = leetcode_api.fetch_recent_submissions_bulk(list(usernames), limit=15)
+        return result, post_mock
+
+    def test_maps_aliases_back_to_usernames(self):
+        response = make_response(
+            {"data": {"u0": [submission("two-sum")], "u1": [submission("3sum")]}}
+        )
+
+        result, post_mock = self.fetch(response)
+
+        self.assertEqual(
+            result,
+            {"alice": [submission("two-sum")], "bob": [submission("3sum")]},
+        )
+        variables = post_mock.call_args.kwargs["json"]["variables"]
+        self.assertEqual(variables, {"u0": "alice", "u1": "bob", "limit": 15})
+
+    def test_error_with_path_fails_only_that_user(self):
+        response = make_response(
+            {
+                "errors": [{"message": "User does not exist", "path": ["u1"]}],
+                "data": {"u0": [submission("two-sum")], "u1": None},
+            }
+        )
+
+        result, _ = self.fetch(response)
+
+        self.assertEqual(result, {"alice": [submission("two-sum")], "bob": None})
+
+    def test_error_without_path_fails_whole_batch(self):
+        response = make_response({"errors": [{"message": "Query too complex"}]})
+
+        result, _ = self.fetch(response)
+
+        self.assertEqual(result, {"alice": None, "bob": None})
+
+    def test_non_ok_or_empty_response_fails_whole_batch(self):
+        for response in (make_response({"data": {}}, status_code=429), make_response()):
+            with self.subTest(status_code=response.status_code):
+                result, _ = self.fetch(response)
+
+                self.assertEqual(result, {"alice": None, "bob": None})
+
+    def test_request_exception_fails_whole_batch(self):
+        with patch.object(
+            leetcode_api._SESSION, "post", side_effect=requests.exceptions.ConnectionError
+        ):
+            result = leetcode_api.fetch_recent_submissions_bulk(["alice"], limit=15)
+
+        self.assertEqual(result, {"alice": None})
+
+    def test_null_data_means_no_submissions(self):
+        result, _ = self.fetch(make_response({"data": None}))
+
+        self.assertEqual(result, {"alice": [], "bob": []})
+
+    def test_empty_batch_skips_request(self):
+        with patch.object(leetcode_api._SESSION, "post") as post_mock:
+            result = leetcode_api.fetch_recent_submissions_bulk([], limit=15)
+
+        self.assertEqual(result, {})
+        post_mock.assert_not_called()
+
+
+class TestBulkQuestionQuery(unittest.TestCase):
+    def test_query_declares_and_aliases_one_field_per_slug(self):
+        query = leetcode_api._bulk_question_query(2)
+
+        self.assertIn("query questionDataBulk($s0: String!, $s1: String!)", query)
+        self.assertIn("q0: question(titleSlug: $s0)", query)
+        self.assertIn("q1: question(titleSlug: $s1)", query)
+        self.assertNotIn("$s2", query)
+
+
+class TestFetchProblemDifficultiesBulk(unittest.TestCase):
+    def fetch(self, response, slugs=("two-sum", "3sum")):
+        with patch.object(leetcode_api._SESSION, "post", return_value=response) as post_mock:
+            result = leetcode_api.fetch_problem_difficulties_bulk(list(slugs))
+        return result, post_mock
+
+    def test_maps_aliases_back_to_slugs(self):
+        response = make_response(
+            {
+                "data": {
+                    "q0": {"difficulty": "Easy", "title": "Two Sum"},
+                    "q1": {"difficulty": "Medium", "title": "3Sum"},
+                }
+            }
+        )
+
+        result, post_mock = self.fetch(response)
+
+        self.assertEqual(result, {"two-sum": ("Easy", "Two Sum"), "3sum": ("Medium", "3Sum")})
+        variables = post_mock.call_args.kwargs["json"]["variables"]
+        self.assertEqual(variables, {"s0": "two-sum", "s1": "3sum"})
+
+    def test_partial_errors_keep_usable_data(self):
+        response = make_response(
+            {
+                "errors": [{"message": "Question not found", "path": ["q1"]}],
+                "data": {"q0": {"difficulty": "Easy", "title": "Two Sum"}, "q1": None},
+            }
+        )
+
+        result, _ = self.fetch(response)
+
+        self.assertEqual(result, {"two-sum": ("Easy", "Two Sum"), "3sum": (None, None)})
+
+    def test_incomplete_question_data_falls_back(self):
+        response = make_response(
+            {"data": {"q0": {"difficulty": "Easy", "title": None}}}
+        )
+
+        result, _ = self.fetch(response, slugs=("two-sum",))
+
+        self.assertEqual(result, {"two-sum": (None, None)})
+
+    def test_non_ok_or_empty_response_falls_back_for_every_slug(self):
+        for response in (make_response({"data": {}}, status_code=500), make_response()):
+            with self.subTest(status_code=response.status_code):
+                result, _ = self.fetch(response)
+
+                self.assertEqual(result, {"two-sum": (None, None), "3sum": (None, None)})
+
+    def test_null_data_falls_back_for_every_slug(self):
+        result, _ = self.fetch(make_response({"data": None}))
+
+        self.assertEqual(result, {"two-sum": (None, None), "3sum": (None, None)})
+
+
+if __name__ == "__main__":
+    unittest.main()